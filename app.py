@@ -1,8 +1,11 @@
 """Main entry point for the MOAD AI Query Application."""
 
+import os
 from app import create_app
 
 app = create_app()
 
 if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0", port=5000) 
\ No newline at end of file
+    # The debugger and reloader are opt-in; they re-import the app and slow every request
+    debug = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
+    app.run(debug=debug, host="0.0.0.0", port=5000) 
\ No newline at end of file
@@ -1,15 +1,17 @@
 """MOAD AI Query Application."""
 import os
 from flask import Flask
-from dotenv import load_dotenv
 from app import routes
 
 __version__ = '1.0.0'
 
 def create_app(test_config=None):
     """Create and configure the Flask application."""
-    # Load environment variables
-    load_dotenv()
+    # Load environment variables from the project's .env file, if there is one
+    env_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+    if os.path.exists(env_file):
+        from dotenv import load_dotenv
+        load_dotenv(env_file)
 
     app = Flask(__name__, 
                 instance_relative_config=True,
@@ -1,33 +1,42 @@
 from langchain.chat_models import ChatOpenAI
 from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
-from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+from functools import lru_cache
 import os
 from dotenv import load_dotenv
+from app.api.content_manager import ContentManager
 
-load_dotenv()
+@lru_cache(maxsize=1)
+def _default_llm() -> ChatOpenAI:
+    """Create the chat model shared by all agents that are not given one."""
+    load_dotenv()
+    return ChatOpenAI(temperature=0, model_name="gpt-4o")
 
-class Document(BaseModel):
+class Document:
     """Represents a document with content and metadata."""
-    content: str
-    metadata: Dict[str, Any] = {}
+    __slots__ = ('content', 'metadata')
     
-    class Config:
-        arbitrary_types_allowed = True
+    def __init__(self, content: str, metadata: Optional[Dict[str, Any]] = None):
+        self.content = content
+        self.metadata = metadata if metadata is not None else {}
+    
+    def __repr__(self) -> str:
+        return f"Document(content={self.content!r}, metadata={self.metadata!r})"
 
 class RetrievalAgent:
     """Agent responsible for retrieving relevant information from the MOAD."""
     
-    def __init__(self, moad_content: Dict[str, Any]):
+    def __init__(self, content_manager: ContentManager, llm: Optional[ChatOpenAI] = None):
         """
-        Initialize with the extracted MOAD content.
+        Initialize with the MOAD content manager.
         
         Args:
-            moad_content: Dictionary mapping slide IDs to slide content
+            content_manager: Content manager with the MOAD content loaded
+            llm: Chat model to use (defaults to the shared model)
         """
-        self.moad_content = moad_content
-        self.llm = ChatOpenAI(temperature=0, model_name="gpt-4o")
+        self.content_manager = content_manager
+        self.llm = llm or _default_llm()
         
         self.retrieval_prompt = PromptTemplate(
             input_variables=["query", "num_results"],
@@ -55,34 +64,22 @@ class RetrievalAgent:
         Returns:
             List of Document objects
         """
-        # Simple keyword matching for now, can be improved with vector search
-        results = []
-        
-        # Rank slides based on relevance to query
-        relevant_slides = {}
-        for slide_id, content in self.moad_content.items():
-            query_terms = query.lower().split()
-            score = sum(1 for term in query_terms if term in content.lower())
-            if score > 0:
-                relevant_slides[slide_id] = score
-        
-        # Sort by relevance score
-        sorted_slides = sorted(relevant_slides.items(), key=lambda x: x[1], reverse=True)
-        
-        # Take top results
-        for slide_id, _ in sorted_slides[:num_results]:
-            results.append(Document(
-                content=self.moad_content[slide_id],
-                metadata={"slide_id": slide_id}
-            ))
-        
-        return results
+        # Delegate to the content manager's hybrid semantic/keyword search
+        slides = self.content_manager.get_relevant_slides(query, max_results=num_results)
+        
+        return [
+            Document(
+                content=slide["content"],
+                metadata={"slide_id": slide["slide_id"], "score": slide["relevance_score"]}
+            )
+            for slide in slides
+        ]
 
 class AnalysisAgent:
     """Agent responsible for analyzing retrieved information."""
     
-    def __init__(self):
-        self.llm = ChatOpenAI(temperature=0, model_name="gpt-4o")
+    def __init__(self, llm: Optional[ChatOpenAI] = None):
+        self.llm = llm or _default_llm()
         
         self.analysis_prompt = PromptTemplate(
             input_variables=["query", "documents"],
@@ -120,9 +117,9 @@ class AnalysisAgent:
 class VerificationAgent:
     """Agent responsible for verifying information accuracy."""
     
-    def __init__(self, moad_content: Dict[str, Any]):
+    def __init__(self, moad_content: Dict[str, Any], llm: Optional[ChatOpenAI] = None):
         self.moad_content = moad_content
-        self.llm = ChatOpenAI(temperature=0, model_name="gpt-4o")
+        self.llm = llm or _default_llm()
         
         self.verification_prompt = PromptTemplate(
             input_variables=["analysis", "documents"],
@@ -169,8 +166,8 @@ class VerificationAgent:
 class SummarizationAgent:
     """Agent responsible for creating concise summaries."""
     
-    def __init__(self):
-        self.llm = ChatOpenAI(temperature=0, model_name="gpt-4o")
+    def __init__(self, llm: Optional[ChatOpenAI] = None):
+        self.llm = llm or _default_llm()
         
         self.summarization_prompt = PromptTemplate(
             input_variables=["query", "analysis", "verification"],
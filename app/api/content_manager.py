@@ -1,30 +1,173 @@
 import os
 import json
+import logging
+import pickle
 import re
 import numpy as np
+from collections import defaultdict
+from functools import lru_cache
 from typing import Dict, List, Any, Optional, Tuple
 from app.api.pptx_extractor import PPTXExtractor
+from app.utils.embedding_inputs import EMBEDDING_MODEL, embedding_batches
+from app.utils.openai_client import get_openai_client
+from app.utils.term_scanner import TermScanner
+from app.utils.top_k import top_k_indices
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib json parser
+    orjson = None
+
+try:
+    import faiss
+except ImportError:  # faiss is optional, fall back to the exact matrix-vector scan
+    faiss = None
+
+try:
+    import numba
+except ImportError:  # numba is optional, fall back to numpy slice updates
+    numba = None
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Product names, features, and license types are important query terms
+_IMPORTANT_RE = re.compile(
+    r'\b(itsm|itom|csx|hrsd|csm|itbm'
+    r'|virtual agent|workflow|now assist|ai|chatbot'
+    r'|standard|pro|enterprise|pro\+)\b'
+)
+_FEATURE_RE = re.compile(r'\b(virtual agent|workflow|now assist|ai|chatbot|search)\b')
+
+# License and comparison words that together mark a license comparison query;
+# words are anchored at the start only so plurals and inflections still match
+# ("editions", "licensing", "compared", "differences", "professional")
+_LICENSE_RE = re.compile(r'\b(?:licens\w*|editions?|tiers?|standard|pro\w*|enterprise)')
+_COMPARE_RE = re.compile(r'\b(?:compar\w*|differen\w*|vs\b|versus|between)')
+
+# Top semantic score below which license queries also use the specialized license search
+_LICENSE_FALLBACK_SCORE = 0.35
+
+# Number of slides sent per embeddings API request
+_EMBEDDING_BATCH_SIZE = 100
+
+# Approximate nearest-neighbor search only pays off for large decks
+_ANN_MIN_SLIDES = 5000
+_HNSW_NEIGHBORS = 32
+_HNSW_EF_SEARCH = 64
+
+# Fixed vocabularies for license comparison slide detection
+_TIER_TERMS = frozenset(['standard', 'pro', 'enterprise', 'pro+'])
+_LICENSE_WORDS = frozenset(['license', 'edition', 'tier'])
+_MATRIX_TERMS = frozenset(['capability', 'matrix', 'feature matrix', 'table'])
+
+# Single-pass scanner built once at import time
+_SLIDE_SCANNER = TermScanner(_TIER_TERMS | _LICENSE_WORDS | _MATRIX_TERMS)
+
+def _score_postings(offsets: np.ndarray, postings: np.ndarray, term_ids: np.ndarray,
+                    weights: np.ndarray, n_slides: int) -> np.ndarray:
+    """
+    Accumulate per-slide keyword scores from a CSR posting list.
+    
+    Args:
+        offsets: Start of each term's postings (length num_terms + 1)
+        postings: Slide indices for all terms, concatenated
+        term_ids: Query term IDs to score
+        weights: Weight added to each matching slide, per query term
+        n_slides: Total number of slides
+        
+    Returns:
+        int32 array of scores, one per slide
+    """
+    scores = np.zeros(n_slides, dtype=np.int32)
+    for tid, weight in zip(term_ids, weights):
+        scores[postings[offsets[tid]:offsets[tid + 1]]] += weight
+    return scores
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _score_postings(offsets, postings, term_ids, weights, n_slides):
+        scores = np.zeros(n_slides, dtype=np.int32)
+        for i in range(term_ids.shape[0]):
+            tid = term_ids[i]
+            weight = weights[i]
+            for j in range(offsets[tid], offsets[tid + 1]):
+                scores[postings[j]] += weight
+        return scores
+
+@lru_cache(maxsize=2048)
+def _is_license_comparison(query: str) -> bool:
+    """Check if a query compares licenses; memoized since every search path asks."""
+    # Skip the second scan if the first fails
+    query_lower = query.lower()
+    return bool(_LICENSE_RE.search(query_lower) and _COMPARE_RE.search(query_lower))
+
+@lru_cache(maxsize=2048)
+def _query_feature(query: str) -> Optional[str]:
+    """Return the first product feature named in a query, or None."""
+    feature_match = _FEATURE_RE.search(query.lower())
+    return feature_match.group(1) if feature_match else None
+
+@lru_cache(maxsize=1024)
+def _embed_query(text: str) -> Tuple[float, ...]:
+    """
+    Embed a text with the OpenAI API, memoized so repeated queries skip the round-trip.
+    
+    Failures raise instead of returning None so they are never cached.
+    """
+    response = get_openai_client().embeddings.create(
+        input=text,
+        model=EMBEDDING_MODEL
+    )
+    
+    return tuple(response.data[0].embedding)
 
 class ContentManager:
     """Manages the extraction, storage, and retrieval of MOAD content."""
     
     def __init__(self, pptx_path: str, cache_path: str = "moad_content.json", 
-                 embeddings_path: str = "moad_embeddings.json"):
+                 embeddings_path: str = "moad_embeddings.npy"):
         """
         Initialize the content manager.
         
         Args:
             pptx_path: Path to the MOAD PowerPoint file
-            cache_path: Path to cache the extracted content
-            embeddings_path: Path to cache the content embeddings
+            cache_path: Path to cache the extracted content (JSON export; a pickled
+                copy at <name>.pkl is what gets loaded at startup)
+            embeddings_path: Path to cache the content embeddings as a float16 .npy
+                matrix; slide IDs are stored in a sidecar <name>_ids.json and a
+                legacy <name>.json cache is migrated on first load
         """
         self.pptx_path = pptx_path
         self.cache_path = cache_path
-        self.embeddings_path = embeddings_path
+        self.cache_bin_path = os.path.splitext(cache_path)[0] + ".pkl"
+        embeddings_base = os.path.splitext(embeddings_path)[0]
+        self.embeddings_path = embeddings_base + ".npy"
+        self.embeddings_ids_path = embeddings_base + "_ids.json"
+        self._legacy_embeddings_path = embeddings_base + ".json"
+        self.ann_index_path = embeddings_base + ".faiss"
         self.content = {}
         self.embeddings = {}
         self.enable_semantic_search = True  # Can be toggled if embeddings unavailable
         
+        # Lowercased slide content and a CSR token -> slide index posting list, built once per load
+        self._content_lower: Dict[str, str] = {}
+        self._slide_list: List[str] = []
+        self._term_ids: Dict[str, int] = {}
+        self._posting_offsets = np.zeros(1, dtype=np.int32)
+        self._posting_slides = np.zeros(0, dtype=np.int32)
+        
+        # Capability matrix / license comparison slides and their query-independent relevance
+        self._license_slides: Dict[str, int] = {}
+        
+        # Row-aligned, L2-normalized embedding matrix (self.embeddings maps IDs to its rows)
+        self._slide_ids: List[str] = []
+        self._emb_matrix: Optional[np.ndarray] = None
+        
+        # HNSW index over the embedding matrix for large decks (requires faiss)
+        self._ann_index = None
+        
     def load_content(self) -> Dict[str, str]:
         """
         Load content either from cache or by extracting from PPTX.
@@ -33,38 +176,37 @@ class ContentManager:
             Dictionary mapping slide IDs to slide content
         """
         # Check if cached content exists
-        if os.path.exists(self.cache_path):
-            print(f"Loading cached content from {self.cache_path}")
+        if os.path.exists(self.cache_bin_path) or os.path.exists(self.cache_path):
+            logger.info("Loading cached content from %s", self.cache_path)
             try:
-                with open(self.cache_path, 'r', encoding='utf-8') as f:
-                    self.content = json.load(f)
-                print(f"Successfully loaded {len(self.content)} slides from cache")
+                self.content = self._read_cache()
+                self._index_content()
+                logger.info("Successfully loaded %d slides from cache", len(self.content))
                 
                 # Try to load embeddings if available
-                if os.path.exists(self.embeddings_path):
-                    try:
-                        with open(self.embeddings_path, 'r', encoding='utf-8') as f:
-                            self.embeddings = json.load(f)
-                        print(f"Successfully loaded embeddings for {len(self.embeddings)} slides")
-                    except Exception as e:
-                        print(f"Warning: Could not load embeddings, semantic search disabled: {str(e)}")
+                try:
+                    if self._load_embeddings():
+                        logger.info("Successfully loaded embeddings for %d slides", len(self.embeddings))
+                    else:
+                        logger.info("No embeddings file found, semantic search disabled")
                         self.enable_semantic_search = False
-                else:
-                    print("No embeddings file found, semantic search disabled")
+                except Exception as e:
+                    logger.warning("Could not load embeddings, semantic search disabled: %s", e)
                     self.enable_semantic_search = False
                 
                 return self.content
             except Exception as e:
-                print(f"Error loading cached content: {str(e)}")
+                logger.error("Error loading cached content: %s", e)
                 # Fall back to extraction if cache loading fails
         
         # Extract content from PPTX
         if os.path.exists(self.pptx_path):
-            print(f"Extracting content from {self.pptx_path}")
+            logger.info("Extracting content from %s", self.pptx_path)
             try:
                 extractor = PPTXExtractor(self.pptx_path)
                 self.content = extractor.extract_content()
-                print(f"Successfully extracted {len(self.content)} slides")
+                self._index_content()
+                logger.info("Successfully extracted %d slides", len(self.content))
                 
                 # Save to cache
                 self.save_to_cache()
@@ -73,15 +215,15 @@ class ContentManager:
                 try:
                     self._generate_embeddings()
                 except Exception as e:
-                    print(f"Warning: Could not generate embeddings, semantic search disabled: {str(e)}")
+                    logger.warning("Could not generate embeddings, semantic search disabled: %s", e)
                     self.enable_semantic_search = False
                 
                 return self.content
             except Exception as e:
-                print(f"Error extracting content: {str(e)}")
+                logger.error("Error extracting content: %s", e)
                 return {}
         else:
-            print(f"PPTX file not found: {self.pptx_path}")
+            logger.error("PPTX file not found: %s", self.pptx_path)
             return {}
     
     def save_to_cache(self) -> bool:
@@ -94,12 +236,41 @@ class ContentManager:
         try:
             with open(self.cache_path, 'w', encoding='utf-8') as f:
                 json.dump(self.content, f, ensure_ascii=False, indent=2)
-            print(f"Content saved to cache: {self.cache_path}")
+            self._write_cache_bin(self.content)
+            logger.info("Content saved to cache: %s", self.cache_path)
             return True
         except Exception as e:
-            print(f"Error saving to cache: {str(e)}")
+            logger.error("Error saving to cache: %s", e)
             return False
     
+    def _read_cache(self) -> Dict[str, str]:
+        """
+        Read cached content, preferring the pickled copy when it is at least as
+        new as the JSON export and creating it from the JSON otherwise.
+        
+        Returns:
+            Dictionary mapping slide IDs to slide content
+        """
+        if os.path.exists(self.cache_bin_path) and (
+                not os.path.exists(self.cache_path) or
+                os.path.getmtime(self.cache_bin_path) >= os.path.getmtime(self.cache_path)):
+            with open(self.cache_bin_path, 'rb') as f:
+                return pickle.load(f)
+        
+        with open(self.cache_path, 'r', encoding='utf-8') as f:
+            content = json.load(f)
+        
+        try:
+            self._write_cache_bin(content)
+        except Exception as e:
+            logger.warning("Could not write binary content cache: %s", e)
+        return content
+    
+    def _write_cache_bin(self, content: Dict[str, str]) -> None:
+        """Write the pickled copy of the content that is loaded at startup."""
+        with open(self.cache_bin_path, 'wb') as f:
+            pickle.dump(content, f, protocol=pickle.HIGHEST_PROTOCOL)
+    
     def _generate_embeddings(self) -> bool:
         """
         Generate embeddings for all slides using OpenAI API.
@@ -108,44 +279,170 @@ class ContentManager:
             True if successful, False otherwise
         """
         try:
-            import openai
-            import os
-            
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                print("Warning: OpenAI API key not found, semantic search disabled")
+            client = get_openai_client()
+            if client is None:
+                logger.warning("OpenAI API key not found, semantic search disabled")
                 self.enable_semantic_search = False
                 return False
             
-            client = openai.OpenAI(api_key=api_key)
             embeddings_dict = {}
             
-            print("Generating embeddings for all slides...")
-            for slide_id, content in self.content.items():
-                # Use only the first 8000 chars to stay within token limits
-                truncated_content = content[:8000]
-                
+            logger.info("Generating embeddings for all slides...")
+            slide_ids = list(self.content)
+            
+            # Slides go out in batches bounded by both slide count and total tokens
+            offset = 0
+            for batch_inputs in embedding_batches((self.content[slide_id] for slide_id in slide_ids),
+                                                  _EMBEDDING_BATCH_SIZE):
+                # Embed the whole batch in a single request
                 response = client.embeddings.create(
-                    input=truncated_content,
-                    model="text-embedding-3-small"
+                    input=batch_inputs,
+                    model=EMBEDDING_MODEL
                 )
                 
-                embeddings_dict[slide_id] = response.data[0].embedding
+                for item in response.data:
+                    embeddings_dict[slide_ids[offset + item.index]] = item.embedding
+                offset += len(batch_inputs)
                 
+            self._set_embedding_matrix(slide_ids, [embeddings_dict[slide_id] for slide_id in slide_ids])
+            
             # Save embeddings to file
-            with open(self.embeddings_path, 'w', encoding='utf-8') as f:
-                json.dump(embeddings_dict, f)
-                
-            self.embeddings = embeddings_dict
-            print(f"Successfully generated and saved embeddings for {len(embeddings_dict)} slides")
+            self._save_embeddings()
+            self._prepare_ann_index()
+            
+            logger.info("Successfully generated and saved embeddings for %d slides", len(embeddings_dict))
             self.enable_semantic_search = True
             return True
             
         except Exception as e:
-            print(f"Error generating embeddings: {str(e)}")
+            logger.error("Error generating embeddings: %s", e)
             self.enable_semantic_search = False
             return False
     
+    def _index_content(self) -> None:
+        """
+        Precompute lowercased slide content and an inverted token index so
+        keyword search does not re-lowercase and rescan every slide per query.
+        
+        The index is stored CSR-style: the postings of term ID t are
+        _posting_slides[_posting_offsets[t]:_posting_offsets[t + 1]].
+        """
+        self._content_lower = {sid: c.lower() for sid, c in self.content.items()}
+        self._slide_list = list(self.content)
+        
+        inverted = defaultdict(list)
+        license_slides = {}
+        for index, (slide_id, content_lower) in enumerate(self._content_lower.items()):
+            for token in set(_TOKEN_RE.findall(content_lower)):
+                inverted[token].append(index)
+            
+            # Find all license indicator terms in a single pass over the slide
+            found = _SLIDE_SCANNER.find(content_lower)
+            
+            # Check for indicators of capability matrices
+            is_capability_matrix = ('capability' in found and 'matrix' in found) or 'feature matrix' in found
+            
+            # Check for license comparison indicators
+            has_license_comparison = not found.isdisjoint(_TIER_TERMS) and not found.isdisjoint(_LICENSE_WORDS)
+            
+            if is_capability_matrix or has_license_comparison:
+                relevance = 0
+                if is_capability_matrix:
+                    relevance += 2
+                if has_license_comparison:
+                    relevance += 2
+                if 'table' in found:
+                    relevance += 1
+                license_slides[slide_id] = relevance
+        
+        self._term_ids = {term: i for i, term in enumerate(inverted)}
+        lengths = np.fromiter((len(p) for p in inverted.values()), dtype=np.int32, count=len(inverted))
+        self._posting_offsets = np.zeros(len(inverted) + 1, dtype=np.int32)
+        np.cumsum(lengths, out=self._posting_offsets[1:])
+        self._posting_slides = np.fromiter(
+            (index for postings in inverted.values() for index in postings),
+            dtype=np.int32, count=int(self._posting_offsets[-1]))
+        self._license_slides = license_slides
+    
+    def _load_embeddings(self) -> bool:
+        """
+        Load slide embeddings from the .npy cache, migrating a legacy JSON cache if present.
+        
+        Returns:
+            True if embeddings were loaded, False if no embeddings cache exists
+        """
+        if os.path.exists(self.embeddings_path) and os.path.exists(self.embeddings_ids_path):
+            with open(self.embeddings_ids_path, 'r', encoding='utf-8') as f:
+                slide_ids = json.load(f)
+            self._set_embedding_matrix(slide_ids, np.load(self.embeddings_path, mmap_mode='r'))
+            self._prepare_ann_index()
+            return True
+        
+        if os.path.exists(self._legacy_embeddings_path):
+            with open(self._legacy_embeddings_path, 'rb') as f:
+                data = f.read()
+            embeddings = orjson.loads(data) if orjson is not None else json.loads(data)
+            del data
+            slide_ids = list(embeddings)
+            matrix = np.array([embeddings[slide_id] for slide_id in slide_ids], dtype=np.float32)
+            del embeddings
+            self._set_embedding_matrix(slide_ids, matrix)
+            self._save_embeddings()
+            self._prepare_ann_index()
+            return True
+        
+        return False
+    
+    def _save_embeddings(self) -> None:
+        """Save the (already L2-normalized) embedding matrix as float16 .npy plus a JSON list of slide IDs."""
+        np.save(self.embeddings_path, self._emb_matrix.astype(np.float16))
+        with open(self.embeddings_ids_path, 'w', encoding='utf-8') as f:
+            json.dump(self._slide_ids, f)
+    
+    def _prepare_ann_index(self) -> None:
+        """
+        Load or build the HNSW index used for semantic search on large decks.
+        
+        The index is only used when faiss is installed and the deck has at least
+        _ANN_MIN_SLIDES slides; smaller decks keep the exact matrix-vector scan.
+        A saved index is reused while it is newer than the .npy cache.
+        """
+        self._ann_index = None
+        if faiss is None or self._emb_matrix is None or len(self._slide_ids) < _ANN_MIN_SLIDES:
+            return
+        
+        if (os.path.exists(self.ann_index_path)
+                and os.path.getmtime(self.ann_index_path) >= os.path.getmtime(self.embeddings_path)):
+            index = faiss.read_index(self.ann_index_path)
+            if index.ntotal == len(self._slide_ids) and index.d == self._emb_matrix.shape[1]:
+                index.hnsw.efSearch = _HNSW_EF_SEARCH
+                self._ann_index = index
+                return
+        
+        # Rows are L2-normalized, so inner product is cosine similarity
+        index = faiss.IndexHNSWFlat(self._emb_matrix.shape[1], _HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+        index.add(self._emb_matrix)
+        index.hnsw.efSearch = _HNSW_EF_SEARCH
+        faiss.write_index(index, self.ann_index_path)
+        self._ann_index = index
+    
+    def _set_embedding_matrix(self, slide_ids: List[str], matrix: Any) -> None:
+        """
+        Store the slide embeddings as a single L2-normalized float32 matrix
+        so semantic search is one matrix-vector product instead of a per-slide loop.
+        
+        Args:
+            slide_ids: Slide IDs in row order
+            matrix: Embedding rows (array-like, any float dtype)
+        """
+        matrix = np.array(matrix, dtype=np.float32).reshape(len(slide_ids), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.maximum(norms, 1e-12)
+        
+        self._slide_ids = list(slide_ids)
+        self._emb_matrix = matrix if self._slide_ids else None
+        self.embeddings = dict(zip(self._slide_ids, matrix))
+    
     def get_embedding(self, text: str) -> Optional[List[float]]:
         """
         Get embedding for a text string using OpenAI API.
@@ -157,30 +454,22 @@ class ContentManager:
             Embedding vector or None if failed
         """
         try:
-            import openai
-            import os
-            
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
+            if get_openai_client() is None:
                 return None
             
-            client = openai.OpenAI(api_key=api_key)
-            
-            response = client.embeddings.create(
-                input=text,
-                model="text-embedding-3-small"
-            )
-            
-            return response.data[0].embedding
+            return list(_embed_query(text))
             
         except Exception as e:
-            print(f"Error getting embedding: {str(e)}")
+            logger.error("Error getting embedding: %s", e)
             return None
     
     def cosine_similarity(self, a: List[float], b: List[float]) -> float:
         """
         Calculate cosine similarity between two vectors.
         
+        Stored slide embeddings are unit-length, so search uses a plain dot
+        product against them; this helper is for arbitrary vectors.
+        
         Args:
             a: First vector
             b: Second vector
@@ -208,9 +497,6 @@ class ContentManager:
         if use_semantic is not None:
             should_use_semantic = use_semantic and self.enable_semantic_search
             
-        # Check for license comparison queries
-        is_license_query = self._is_license_comparison_query(query)
-            
         if should_use_semantic:
             # Try semantic search
             try:
@@ -218,15 +504,17 @@ class ContentManager:
                 
                 # If this is a license comparison query and we didn't get good results,
                 # fall back to specialized license search
-                if is_license_query:
+                weak_results = not semantic_results or semantic_results[0]["relevance_score"] < _LICENSE_FALLBACK_SCORE
+                if weak_results and self._is_license_comparison_query(query):
                     license_results = self._search_license_comparison(query, max_results)
                     # Merge results, prioritizing license-specific ones
-                    combined_results = license_results + [r for r in semantic_results if r["slide_id"] not in [lr["slide_id"] for lr in license_results]]
+                    seen = {r["slide_id"] for r in license_results}
+                    combined_results = license_results + [r for r in semantic_results if r["slide_id"] not in seen]
                     return combined_results[:max_results]
                     
                 return semantic_results
             except Exception as e:
-                print(f"Semantic search failed: {str(e)}. Falling back to keyword search.")
+                logger.warning("Semantic search failed: %s. Falling back to keyword search.", e)
                 # Fall back to keyword search
         
         # Use keyword matching if semantic search is disabled or failed
@@ -248,14 +536,25 @@ class ContentManager:
         if not query_embedding:
             raise ValueError("Failed to get embedding for query")
             
-        # Calculate similarity scores
-        scores = {}
-        for slide_id, slide_embedding in self.embeddings.items():
-            similarity = self.cosine_similarity(query_embedding, slide_embedding)
-            scores[slide_id] = similarity
+        if self._emb_matrix is None:
+            raise ValueError("No slide embeddings available")
+            
+        query_vec = np.asarray(query_embedding, dtype=np.float32)
+        query_vec /= max(float(np.linalg.norm(query_vec)), 1e-12)
+        
+        if self._ann_index is not None:
+            # Approximate nearest neighbors from the HNSW graph
+            k = min(max_results, len(self._slide_ids))
+            similarities, indices = self._ann_index.search(query_vec.reshape(1, -1), k)
+            sorted_scores = [(self._slide_ids[i], float(score))
+                             for i, score in zip(indices[0], similarities[0]) if i >= 0]
+        else:
+            # Cosine similarity against every slide in a single matrix-vector product
+            scores = self._emb_matrix @ query_vec
             
-        # Sort by score
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+            # Select the top results without sorting every slide
+            order = top_k_indices(scores, max_results)
+            sorted_scores = [(self._slide_ids[i], float(scores[i])) for i in order]
         
         # Take top results
         results = []
@@ -281,35 +580,48 @@ class ContentManager:
         Returns:
             List of dictionaries with slide ID and content
         """
-        # Enhanced keyword matching with weights for important terms
-        relevant_slides = {}
-        
         # Extract important terms
         important_terms = self._extract_important_terms(query)
-        query_terms = query.lower().split()
+        query_lower = query.lower()
+        query_terms = _TOKEN_RE.findall(query_lower)
         
-        for slide_id, content in self.content.items():
-            content_lower = content.lower()
-            
-            # Calculate base score from all query terms
-            base_score = sum(1 for term in query_terms if term in content_lower)
+        # Base score of 1 per query term, plus extra weight for single-word important terms
+        term_weights = defaultdict(int)
+        for term in query_terms:
+            term_weights[term] += 1
+        phrase_terms = []
+        for term in important_terms:
+            if _TOKEN_RE.fullmatch(term):
+                term_weights[term] += 3
+            else:
+                phrase_terms.append(term)
+        
+        known_terms = [term for term in term_weights if term in self._term_ids]
+        term_ids = np.array([self._term_ids[term] for term in known_terms], dtype=np.int32)
+        weights = np.array([term_weights[term] for term in known_terms], dtype=np.int32)
+        scores = _score_postings(self._posting_offsets, self._posting_slides,
+                                 term_ids, weights, len(self._slide_list))
+        
+        # Only slides sharing at least one token with the query can score
+        candidates = np.flatnonzero(scores)
+        for i in candidates:
+            content_lower = self._content_lower[self._slide_list[i]]
             
-            # Add extra weight for important terms
-            important_score = sum(3 for term in important_terms if term in content_lower)
+            # Add extra weight for important multi-word terms
+            scores[i] += sum(3 for term in phrase_terms if term in content_lower)
             
             # Add extra weight for exact phrases
-            phrase_score = 2 if query.lower() in content_lower else 0
-            
-            total_score = base_score + important_score + phrase_score
-            if total_score > 0:
-                relevant_slides[slide_id] = total_score
+            if query_lower in content_lower:
+                scores[i] += 2
         
-        # Sort by relevance score
-        sorted_slides = sorted(relevant_slides.items(), key=lambda x: x[1], reverse=True)
+        # Select the top results without sorting every candidate
+        candidate_scores = scores[candidates]
+        top = candidates[top_k_indices(candidate_scores, max_results)]
         
         # Take top results
         results = []
-        for slide_id, score in sorted_slides[:max_results]:
+        for i in top:
+            slide_id, score = self._slide_list[i], int(scores[i])
             content = self.content[slide_id]
             results.append({
                 "slide_id": slide_id,
@@ -322,7 +634,8 @@ class ContentManager:
         if self._is_license_comparison_query(query) and len(results) < max_results:
             license_results = self._search_license_comparison(query, max_results - len(results))
             # Merge results, avoiding duplicates
-            results.extend([r for r in license_results if r["slide_id"] not in [res["slide_id"] for res in results]])
+            seen = {r["slide_id"] for r in results}
+            results.extend([r for r in license_results if r["slide_id"] not in seen])
             results = results[:max_results]
         
         return results
@@ -337,21 +650,7 @@ class ContentManager:
         Returns:
             List of important terms
         """
-        # Product names, features, and license types are important
-        important_patterns = [
-            r'\b(itsm|itom|csx|hrsd|csm|itbm)\b',  # Product names
-            r'\b(virtual agent|workflow|now assist|ai|chatbot)\b',  # Features
-            r'\b(standard|pro|enterprise|pro\+)\b',  # License types
-        ]
-        
-        important_terms = []
-        query_lower = query.lower()
-        
-        for pattern in important_patterns:
-            matches = re.findall(pattern, query_lower)
-            important_terms.extend(matches)
-            
-        return important_terms
+        return _IMPORTANT_RE.findall(query.lower())
     
     def _is_license_comparison_query(self, query: str) -> bool:
         """
@@ -363,16 +662,7 @@ class ContentManager:
         Returns:
             True if query is about license comparisons
         """
-        query_lower = query.lower()
-        
-        # Check for license comparison indicators
-        license_terms = ['license', 'edition', 'tier', 'standard', 'pro', 'enterprise', 'pro+']
-        comparison_terms = ['compare', 'comparison', 'difference', 'vs', 'versus', 'between']
-        
-        has_license = any(term in query_lower for term in license_terms)
-        has_comparison = any(term in query_lower for term in comparison_terms)
-        
-        return has_license and has_comparison
+        return _is_license_comparison(query)
     
     def _search_license_comparison(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
         """
@@ -385,36 +675,19 @@ class ContentManager:
         Returns:
             List of dictionaries with slide ID and content
         """
-        feature_match = re.search(r'\b(virtual agent|workflow|now assist|ai|chatbot|search)\b', query.lower())
-        feature = feature_match.group(1) if feature_match else None
+        feature = _query_feature(query)
         
-        # Look for capability matrices and comparison charts
+        # Look for capability matrices and comparison charts among the slides
+        # classified at load time
         capability_matrices = []
-        for slide_id, content in self.content.items():
-            content_lower = content.lower()
-            
-            # Check for indicators of capability matrices
-            is_capability_matrix = ('capability' in content_lower and 'matrix' in content_lower) or 'feature matrix' in content_lower
-            
-            # Check for license comparison indicators
-            has_license_comparison = any(term in content_lower for term in ['standard', 'pro', 'enterprise', 'pro+']) and any(term in content_lower for term in ['license', 'edition', 'tier'])
-            
+        for slide_id, relevance in self._license_slides.items():
             # Check for feature reference if specified
-            has_feature = not feature or feature in content_lower
-            
-            if (is_capability_matrix or has_license_comparison) and has_feature:
-                # Calculate a relevance score
-                relevance = 0
-                if is_capability_matrix:
-                    relevance += 2
-                if has_license_comparison:
-                    relevance += 2
-                if feature and feature in content_lower:
-                    relevance += 3
-                if 'table' in content_lower:
-                    relevance += 1
-                    
-                capability_matrices.append((slide_id, relevance))
+            if feature:
+                if feature not in self._content_lower[slide_id]:
+                    continue
+                relevance += 3
+                
+            capability_matrices.append((slide_id, relevance))
         
         # Sort by relevance
         sorted_matrices = sorted(capability_matrices, key=lambda x: x[1], reverse=True)
@@ -1,9 +1,122 @@
 import os
+import re
+import atexit
+import logging
+import queue
+import random
 import sqlite3
+import threading
+import time
 from typing import List, Dict, Any, Optional
 import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from app.api.pptx_extractor import PPTXExtractor
 
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, cached results are then stored uncompressed
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# One-byte header marking how a cached result payload is encoded
+_PAYLOAD_ZSTD = b'z'
+_PAYLOAD_RAW = b'j'
+_ZSTD_LEVEL = 3
+
+# Slides per executemany batch during import, and batches buffered between extraction and insert
+_IMPORT_BATCH_SIZE = 128
+_IMPORT_QUEUE_SIZE = 64
+
+# Fraction of cache writes that also delete expired cache rows
+_PURGE_PROBABILITY = 0.01
+
+# Connection tuning: WAL lets readers run alongside a writer, and commits
+# only sync at checkpoints with synchronous=NORMAL
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+# Slides table; content_preview is computed by SQLite from content on read
+_SQL_CREATE_SLIDES = '''
+CREATE TABLE IF NOT EXISTS {name} (
+    slide_id TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    content_preview TEXT GENERATED ALWAYS AS (
+        substr(content, 1, 200) || CASE WHEN length(content) > 200 THEN '...' ELSE '' END
+    ) VIRTUAL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
+# Query cache table: a 64-bit hash of the normalized query is the key so lookups
+# are an integer rowid seek; query_text guards against collisions
+_SQL_CREATE_QUERIES = '''
+CREATE TABLE IF NOT EXISTS {name} (
+    key INTEGER PRIMARY KEY,
+    query_text TEXT NOT NULL,
+    result BLOB NOT NULL,
+    timestamp REAL NOT NULL
+)
+'''
+
+# Statements used on hot paths, kept as constants so SQLite's statement cache
+# sees identical strings on every call
+_SQL_INSERT_SLIDE = "INSERT OR REPLACE INTO slides (slide_id, content) VALUES (?, ?)"
+_SQL_REBUILD_FTS = "INSERT INTO slides_fts(slides_fts) VALUES('rebuild')"
+_SQL_FIND = """
+SELECT s.slide_id, s.content_preview, bm25(slides_fts) AS score
+FROM slides_fts JOIN slides s ON s.rowid = slides_fts.rowid
+WHERE slides_fts MATCH ?
+ORDER BY rank
+LIMIT ?
+"""
+_SQL_GET_CONTENT = "SELECT content FROM slides WHERE slide_id = ?"
+# Query cache: main.queries on disk is the store every write goes to, cache.queries
+# in memory is a read-through copy of the rows this process has used
+_SQL_CACHE_PUT = "INSERT OR REPLACE INTO cache.queries (key, query_text, result, timestamp) VALUES (?, ?, ?, ?)"
+_SQL_CACHE_GET = "SELECT result FROM cache.queries WHERE key = ? AND query_text = ? AND timestamp >= ?"
+_SQL_CACHE_PURGE = "DELETE FROM cache.queries WHERE timestamp < ?"
+_SQL_STORE_PUT = "INSERT OR REPLACE INTO main.queries (key, query_text, result, timestamp) VALUES (?, ?, ?, ?)"
+_SQL_STORE_GET = "SELECT result, timestamp FROM main.queries WHERE key = ? AND query_text = ? AND timestamp >= ?"
+_SQL_STORE_PURGE = "DELETE FROM main.queries WHERE timestamp < ?"
+
+@lru_cache(maxsize=4096)
+def _normalize_query(query: str) -> str:
+    """Normalize a query for cache lookups: lowercase with collapsed whitespace."""
+    return ' '.join(query.lower().split())
+
+def _query_key(normalized_query: str) -> int:
+    """Hash a normalized query to a signed 64-bit integer usable as a SQLite rowid."""
+    digest = hashlib.blake2b(normalized_query.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+def _encode_result(result: Dict[str, Any]) -> bytes:
+    """Serialize a cached result to JSON, compressed with zstd when available."""
+    payload = json.dumps(result).encode('utf-8')
+    if zstandard is not None:
+        return _PAYLOAD_ZSTD + zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(payload)
+    return _PAYLOAD_RAW + payload
+
+def _decode_result(blob: Any) -> Dict[str, Any]:
+    """Inverse of _encode_result; also accepts plain JSON text from older rows."""
+    if isinstance(blob, str):
+        return json.loads(blob)
+    header, payload = blob[:1], blob[1:]
+    if header == _PAYLOAD_ZSTD:
+        if zstandard is None:
+            raise ValueError("Cached result is zstd-compressed but zstandard is not installed")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    return json.loads(payload)
+
 class DatabaseManager:
     """Manages the storage and retrieval of MOAD content in a SQLite database."""
     
@@ -17,34 +130,114 @@ class DatabaseManager:
         """
         self.db_path = db_path
         self.pptx_path = pptx_path
+        self.fts_enabled = False  # Set by _init_db if SQLite has FTS5
+        
+        # One connection shared by all calls; autocommit mode, writes serialized by the lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._closed = False
+        for pragma in _PRAGMAS:
+            self._conn.execute(pragma)
+        
         self._init_db()
+        atexit.register(self.close)
     
     def _init_db(self) -> None:
         """Initialize the database with required tables."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._conn.cursor()
+        
+        # Move slides stored with a materialized content_preview column to the generated column
+        cursor.execute("PRAGMA table_xinfo(slides)")
+        hidden = {row[1]: row[6] for row in cursor.fetchall()}
+        if hidden.get('content_preview') == 0:
+            self._migrate_slides_table(cursor)
         
         # Create slides table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS slides (
-            slide_id TEXT PRIMARY KEY,
-            content TEXT NOT NULL,
-            content_preview TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        
-        # Create queries table for caching
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS queries (
-            query_text TEXT PRIMARY KEY,
-            result TEXT NOT NULL,
-            timestamp REAL NOT NULL
-        )
-        ''')
+        cursor.execute(_SQL_CREATE_SLIDES.format(name='slides'))
+        
+        # Create a full-text index over slide content, kept in sync by triggers
+        try:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'slides_fts'")
+            fts_exists = cursor.fetchone() is not None
+            
+            cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS slides_fts USING fts5(
+                content,
+                content='slides',
+                content_rowid='rowid',
+                tokenize='porter unicode61'
+            )
+            ''')
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS slides_ai AFTER INSERT ON slides BEGIN
+                INSERT INTO slides_fts(rowid, content) VALUES (new.rowid, new.content);
+            END
+            ''')
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS slides_ad AFTER DELETE ON slides BEGIN
+                INSERT INTO slides_fts(slides_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+            END
+            ''')
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS slides_au AFTER UPDATE ON slides BEGIN
+                INSERT INTO slides_fts(slides_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+                INSERT INTO slides_fts(rowid, content) VALUES (new.rowid, new.content);
+            END
+            ''')
+            
+            # Index slides that were stored before the FTS table existed
+            if not fts_exists:
+                cursor.execute(_SQL_REBUILD_FTS)
+            
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            logger.warning("FTS5 not available, using full scan for slide search: %s", e)
+        
+        # Drop a query cache created with the old TEXT primary key; it only holds cached results
+        cursor.execute("PRAGMA table_info(queries)")
+        columns = [row[1] for row in cursor.fetchall()]
+        if columns and 'key' not in columns:
+            cursor.execute("DROP TABLE queries")
         
-        conn.commit()
-        conn.close()
+        # Cached results are written through to the on-disk table, so they survive
+        # crashes and are shared with other processes using the same database
+        cursor.execute(_SQL_CREATE_QUERIES.format(name='main.queries'))
+        cursor.execute("CREATE INDEX IF NOT EXISTS main.idx_queries_ts ON queries(timestamp)")
+        
+        # Repeated lookups are served from an attached in-memory copy, filled on first use
+        cursor.execute("ATTACH DATABASE ':memory:' AS cache")
+        cursor.execute(_SQL_CREATE_QUERIES.format(name='cache.queries'))
+        cursor.execute("CREATE INDEX IF NOT EXISTS cache.idx_queries_ts ON queries(timestamp)")
+    
+    def close(self) -> None:
+        """Close the connection; cached results are already on disk."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._conn.close()
+    
+    def _migrate_slides_table(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Rebuild the slides table so content_preview becomes a generated column.
+        
+        Rowids are preserved so an existing full-text index stays valid; the
+        triggers dropped along with the old table are recreated by _init_db.
+        """
+        logger.info("Migrating slides table to a generated content_preview column")
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute(_SQL_CREATE_SLIDES.format(name='slides_new'))
+            cursor.execute(
+                "INSERT INTO slides_new (rowid, slide_id, content, created_at) "
+                "SELECT rowid, slide_id, content, created_at FROM slides"
+            )
+            cursor.execute("DROP TABLE slides")
+            cursor.execute("ALTER TABLE slides_new RENAME TO slides")
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
     
     def import_from_pptx(self, pptx_path: Optional[str] = None) -> int:
         """
@@ -60,35 +253,66 @@ class DatabaseManager:
             pptx_path = self.pptx_path
         
         if not pptx_path or not os.path.exists(pptx_path):
-            print(f"PPTX file not found: {pptx_path}")
+            logger.error("PPTX file not found: %s", pptx_path)
             return 0
         
         try:
-            print(f"Extracting content from {pptx_path}")
+            logger.info("Extracting content from %s", pptx_path)
             extractor = PPTXExtractor(pptx_path)
-            content = extractor.extract_content()
+            batches = queue.Queue(maxsize=_IMPORT_QUEUE_SIZE)
+            stop = threading.Event()
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            def extract_batches():
+                # Producer: extract slides in a worker thread, ending with a None sentinel
+                try:
+                    batch = []
+                    for slide_id, slide_content in extractor.iter_slides():
+                        if stop.is_set():
+                            break
+                        batch.append((slide_id, slide_content))
+                        if len(batch) >= _IMPORT_BATCH_SIZE:
+                            batches.put(batch)
+                            batch = []
+                    if batch:
+                        batches.put(batch)
+                finally:
+                    batches.put(None)
             
+            # Insert batches while extraction continues, all in a single transaction
             count = 0
-            for slide_id, slide_content in content.items():
-                content_preview = slide_content[:200] + "..." if len(slide_content) > 200 else slide_content
-                
-                cursor.execute(
-                    "INSERT OR REPLACE INTO slides (slide_id, content, content_preview) VALUES (?, ?, ?)",
-                    (slide_id, slide_content, content_preview)
-                )
-                count += 1
-            
-            conn.commit()
-            conn.close()
+            with ThreadPoolExecutor(max_workers=1) as executor, self._lock:
+                producer = executor.submit(extract_batches)
+                cursor = self._conn.cursor()
+                cursor.execute("BEGIN")
+                try:
+                    batch = batches.get()
+                    while batch is not None:
+                        cursor.executemany(_SQL_INSERT_SLIDE, batch)
+                        count += len(batch)
+                        batch = batches.get()
+                    
+                    # Re-raise any extraction error before committing
+                    producer.result()
+                    
+                    # Make sure the full-text index matches the imported slides
+                    if self.fts_enabled:
+                        cursor.execute(_SQL_REBUILD_FTS)
+                    
+                    cursor.execute("COMMIT")
+                except Exception:
+                    cursor.execute("ROLLBACK")
+                    
+                    # Unblock the producer so the executor can shut down
+                    stop.set()
+                    while batch is not None:
+                        batch = batches.get()
+                    raise
             
-            print(f"Successfully imported {count} slides into the database")
+            logger.info("Successfully imported %d slides into the database", count)
             return count
             
-        except Exception as e:
-            print(f"Error importing from PPTX: {str(e)}")
+        except Exception:
+            logger.exception("Error importing from PPTX")
             return 0
     
     def get_slides_count(self) -> int:
@@ -98,12 +322,21 @@ class DatabaseManager:
         Returns:
             Number of slides
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM slides")
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
+        cursor = self._conn.execute("SELECT COUNT(*) FROM slides")
+        return cursor.fetchone()[0]
+    
+    def get_slide_content(self, slide_id: str) -> Optional[str]:
+        """
+        Get the full content of a slide.
+        
+        Args:
+            slide_id: ID of the slide
+            
+        Returns:
+            Slide content or None if the slide does not exist
+        """
+        row = self._conn.execute(_SQL_GET_CONTENT, (slide_id,)).fetchone()
+        return row[0] if row else None
     
     def find_relevant_slides(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
         """
@@ -114,36 +347,68 @@ class DatabaseManager:
             max_results: Maximum number of results to return
             
         Returns:
-            List of dictionaries with slide information
+            List of dictionaries with slide ID, content preview and score;
+            use get_slide_content to fetch the full text of a slide
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        if self.fts_enabled:
+            return self._search_fts(query, max_results)
         
         # Split query into terms
         query_terms = query.lower().split()
+        if not query_terms:
+            return []
+        
+        # Score and rank in SQLite so only the top rows are returned to Python;
+        # each matching term adds 1 to the score
+        patterns = ["%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                    for term in query_terms]
+        like = "(lower(content) LIKE ? ESCAPE '\\')"
+        score_expr = " + ".join([like] * len(patterns))
+        where_expr = " OR ".join([like] * len(patterns))
+        
+        cursor = self._conn.execute(
+            f"SELECT slide_id, content_preview, {score_expr} AS score FROM slides "
+            f"WHERE {where_expr} ORDER BY score DESC, rowid LIMIT ?",
+            patterns + patterns + [max_results]
+        )
+        
+        return [
+            {
+                'score': score,
+                'slide_id': slide_id,
+                'content_preview': content_preview
+            }
+            for slide_id, content_preview, score in cursor
+        ]
+    
+    def _search_fts(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+        """
+        Find slides matching any query term using the FTS5 index, ranked by BM25.
+        
+        Args:
+            query: Search query
+            max_results: Maximum number of results to return
+            
+        Returns:
+            List of dictionaries with slide ID, content preview and score (higher is better)
+        """
+        # Quote every token so FTS5 query syntax in user input is taken literally
+        terms = _TOKEN_RE.findall(query.lower())
+        if not terms:
+            return []
+        match_query = " OR ".join(f'"{term}"' for term in terms)
+        
+        cursor = self._conn.execute(_SQL_FIND, (match_query, max_results))
         
-        # Get all slides from the database
-        cursor.execute("SELECT slide_id, content, content_preview FROM slides")
-        all_slides = cursor.fetchall()
-        conn.close()
-        
-        # Score slides based on query terms
-        scored_slides = []
-        for slide in all_slides:
-            content = slide['content'].lower()
-            score = sum(1 for term in query_terms if term in content)
-            if score > 0:
-                scored_slides.append({
-                    'score': score,
-                    'slide_id': slide['slide_id'],
-                    'content': slide['content'],
-                    'content_preview': slide['content_preview']
-                })
-        
-        # Sort by score and limit results
-        scored_slides.sort(key=lambda x: x['score'], reverse=True)
-        return scored_slides[:max_results]
+        # bm25() is lower for better matches, flip it so higher scores rank first
+        return [
+            {
+                'score': -score,
+                'slide_id': slide_id,
+                'content_preview': content_preview
+            }
+            for slide_id, content_preview, score in cursor
+        ]
     
     def cache_query(self, query: str, result: Dict[str, Any], expiry_time: int = 86400) -> bool:
         """
@@ -158,32 +423,37 @@ class DatabaseManager:
             True if successful, False otherwise
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Normalize query
-            normalized_query = ' '.join(query.lower().split())
+            normalized_query = _normalize_query(query)
             
-            # Convert result to JSON string
-            result_json = json.dumps(result)
+            # Convert result to a (compressed) JSON payload
+            result_blob = _encode_result(result)
             
             # Current timestamp
-            import time
             timestamp = time.time()
             
-            cursor.execute(
-                "INSERT OR REPLACE INTO queries (query_text, result, timestamp) VALUES (?, ?, ?)",
-                (normalized_query, result_json, timestamp)
-            )
-            
-            conn.commit()
-            conn.close()
+            row = (_query_key(normalized_query), normalized_query, result_blob, timestamp)
+            with self._lock:
+                # Write through to disk and the in-memory copy in one transaction
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.execute(_SQL_STORE_PUT, row)
+                    self._conn.execute(_SQL_CACHE_PUT, row)
+                    
+                    # Occasionally purge expired entries so the tables stay bounded
+                    if random.random() < _PURGE_PROBABILITY:
+                        self._conn.execute(_SQL_STORE_PURGE, (timestamp - expiry_time,))
+                        self._conn.execute(_SQL_CACHE_PURGE, (timestamp - expiry_time,))
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
             
-            print(f"Cached query result for: {normalized_query}")
+            logger.debug("Cached query result for: %s", normalized_query)
             return True
             
-        except Exception as e:
-            print(f"Error caching query: {str(e)}")
+        except Exception:
+            logger.exception("Error caching query")
             return False
     
     def get_cached_query(self, query: str, expiry_time: int = 86400) -> Optional[Dict[str, Any]]:
@@ -199,36 +469,33 @@ class DatabaseManager:
         """
         try:
             # Normalize query
-            normalized_query = ' '.join(query.lower().split())
-            
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT result, timestamp FROM queries WHERE query_text = ?",
-                (normalized_query,)
-            )
+            normalized_query = _normalize_query(query)
             
-            row = cursor.fetchone()
-            conn.close()
+            # Only return entries that have not expired
+            params = (_query_key(normalized_query), normalized_query, time.time() - expiry_time)
             
-            if not row:
-                print(f"Query cache miss for: {normalized_query}")
-                return None
-            
-            # Check if cache is expired
-            import time
-            if time.time() - row['timestamp'] > expiry_time:
-                print(f"Query cache expired for: {normalized_query}")
-                return None
+            # The connection is shared, so reads must not interleave with another
+            # thread's write transaction
+            with self._lock:
+                row = self._conn.execute(_SQL_CACHE_GET, params).fetchone()
+                
+                if row is None:
+                    # Fall back to the on-disk table (written by earlier runs or other
+                    # processes) and keep a copy in memory for the next lookup
+                    stored = self._conn.execute(_SQL_STORE_GET, params).fetchone()
+                    if stored is None:
+                        logger.debug("Query cache miss for: %s", normalized_query)
+                        return None
+                    self._conn.execute(_SQL_CACHE_PUT, params[:2] + stored)
+                    row = stored[:1]
             
-            # Parse JSON result
-            result = json.loads(row['result'])
-            print(f"Query cache hit for: {normalized_query}")
+            # Decode the JSON payload
+            result_blob, = row
+            result = _decode_result(result_blob)
+            logger.debug("Query cache hit for: %s", normalized_query)
             
             return result
             
-        except Exception as e:
-            print(f"Error retrieving cached query: {str(e)}")
+        except Exception:
+            logger.exception("Error retrieving cached query")
             return None 
\ No newline at end of file
@@ -1,6 +1,111 @@
 import os
 import re
+import copy
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Dict, List, Any, Optional, Tuple
+from app.utils.term_scanner import TermScanner
+
+try:
+    import xxhash
+except ImportError:  # xxhash is optional, content hashing falls back to blake2b
+    xxhash = None
+
+logger = logging.getLogger(__name__)
+
+# Marks the start of the table section in extracted slide content
+_TABLES_MARKER = "--- Tables ---"
+
+# Patterns used on every analysis, compiled once
+_TABLE_SPLIT_RE = re.compile(r'Table \d+:')
+# Case-insensitive search avoids lowercasing slides that mention no matrix at all
+_MATRIX_RE = re.compile(r'(?:capability|feature) matrix', re.IGNORECASE)
+_BULLET_RE = re.compile(r'(?:^|\n)\s*[\•\-\*]\s*(.*?)(?:$|\n)')
+
+# Availability indicators in table cells (substring matches), one alternation each
+_POSITIVE_RE = re.compile('|'.join(map(re.escape, ['yes', 'y', '✓', '✔', 'included', 'available', 'x', 'true'])))
+_NEGATIVE_RE = re.compile('|'.join(map(re.escape, ['no', 'n', '-', 'not included', 'not available', 'false'])))
+
+# Common ServiceNow features, in priority order when a query mentions several
+_FEATURES = [
+    'virtual agent', 'now assist', 'predictive intelligence', 
+    'workflow', 'performance analytics', 'ai search', 'knowledge graph',
+    'chatbot', 'automation', 'cmdb', 'service portal'
+]
+
+# Common abbreviations and variations of feature names
+_FEATURE_VARIATIONS = {
+    'virtual agent': ['va', 'chatbot', 'chat bot', 'conversational bot'],
+    'now assist': ['assist', 'gen ai', 'generative ai', 'llm'],
+    'predictive intelligence': ['pi', 'prediction', 'machine learning', 'ml'],
+    'performance analytics': ['pa', 'analytics', 'reporting']
+}
+
+# Tiers above Standard, lowest first, for naming the minimum tier a feature needs
+_UPGRADE_TIERS = ('pro', 'pro+', 'enterprise')
+
+# Single-pass matcher for the known feature names
+_FEATURE_SCANNER = TermScanner(_FEATURES)
+
+# Number of (feature, slide set) analyses remembered per analyzer
+_ANALYSIS_CACHE_SIZE = 256
+
+def _content_hash(content_list: List[str]) -> int:
+    """Hash a list of slide contents to a 64-bit integer."""
+    data = "\x00".join(content_list).encode('utf-8', 'surrogatepass')
+    if xxhash is not None:
+        return xxhash.xxh64_intdigest(data)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+@lru_cache(maxsize=1024)
+def _feature_for_query(query: str) -> str:
+    """Return the highest priority known feature mentioned in a query, defaulting to 'virtual agent'."""
+    # Find which features are in the query in one pass, then take the highest priority one
+    found = _FEATURE_SCANNER.find(query.lower())
+    for feature in _FEATURES:
+        if feature in found:
+            return feature
+    
+    # If no known feature is found, look for noun phrases
+    # Default to 'virtual agent' for our specific use case
+    return 'virtual agent'
+
+@lru_cache(maxsize=64)
+def _tier_statement_patterns(feature: str, tiers: Tuple[str, ...]) -> Tuple[Dict[str, Tuple[int, bool]], TermScanner]:
+    """
+    Build the explicit availability statements for a feature and a scanner that finds them.
+    
+    Args:
+        feature: The feature being analyzed
+        tiers: License tiers to build statements for
+        
+    Returns:
+        Tuple of (pattern -> (tier index, available) mapping, scanner over all patterns)
+    """
+    patterns = {}
+    for idx, tier in enumerate(tiers):
+        # Positive patterns
+        for pattern in [
+            f"{feature} is included in {tier}",
+            f"{feature} is available in {tier}",
+            f"{tier} includes {feature}",
+            f"{tier} license includes {feature}"
+        ]:
+            patterns[pattern] = (idx, True)
+        
+        # Negative patterns
+        for pattern in [
+            f"{feature} is not included in {tier}",
+            f"{feature} is not available in {tier}",
+            f"{tier} does not include {feature}",
+            f"{tier} license does not include {feature}"
+        ]:
+            patterns[pattern] = (idx, False)
+    
+    return patterns, TermScanner(patterns)
 
 class LicenseAnalyzer:
     """
@@ -8,14 +113,29 @@ class LicenseAnalyzer:
     across different ServiceNow license tiers.
     """
     
+    __slots__ = ('license_tiers', 'products', 'feature_defaults', '_tier_idx', '_variant_index', '_analysis_cache',
+                 '_analysis_lock')
+    
     def __init__(self):
         """Initialize the license analyzer."""
         # ServiceNow license tiers (in order)
         self.license_tiers = ['standard', 'pro', 'pro+', 'enterprise']
+        self._tier_idx = {tier: i for i, tier in enumerate(self.license_tiers)}
         
         # ServiceNow products
         self.products = ['itsm', 'csx', 'itom', 'hrsd', 'csm', 'itbm']
         
+        # Recent analyses keyed by (feature, content hash), least recently used first
+        self._analysis_cache = OrderedDict()
+        self._analysis_lock = threading.Lock()
+        
+        # Maps each feature name and its common abbreviations/variations to the base name
+        self._variant_index = {}
+        for base, variants in _FEATURE_VARIATIONS.items():
+            self._variant_index[base] = base
+            for variant in variants:
+                self._variant_index[variant] = base
+        
         # Common features and their license availability when not explicitly stated
         # This is domain knowledge about typical ServiceNow licensing patterns
         self.feature_defaults = {
@@ -59,6 +179,16 @@ class LicenseAnalyzer:
         # Extract the feature of interest from the query
         feature = self._extract_feature_from_query(query)
         
+        # The analysis only depends on the feature and the slides, so reuse a previous result;
+        # callers get their own copy so changing it can't alter the cached one
+        cache_key = (feature, _content_hash(content_list))
+        with self._analysis_lock:
+            cached = self._analysis_cache.get(cache_key)
+            if cached is not None:
+                self._analysis_cache.move_to_end(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
         # Look for tables and structured content that might contain license info
         tables = self._extract_tables(content_list)
         
@@ -68,15 +198,21 @@ class LicenseAnalyzer:
         # If we couldn't find specific info but have a default for this feature,
         # use the default knowledge
         if feature in self.feature_defaults and not any(tier_info.values()):
-            print(f"Using default knowledge for feature: {feature}")
+            logger.debug("Using default knowledge for feature: %s", feature)
             tier_info = self.feature_defaults[feature]
         
-        return {
+        result = {
             'feature': feature,
             'tiers': tier_info,
             'has_concrete_info': any(tier_info.values()) or bool(tables),
             'tables': tables
         }
+        with self._analysis_lock:
+            self._analysis_cache[cache_key] = result
+            self._analysis_cache.move_to_end(cache_key)
+            if len(self._analysis_cache) > _ANALYSIS_CACHE_SIZE:
+                self._analysis_cache.popitem(last=False)
+        return copy.deepcopy(result)
     
     def _extract_feature_from_query(self, query: str) -> str:
         """
@@ -88,23 +224,7 @@ class LicenseAnalyzer:
         Returns:
             The main feature mentioned in the query
         """
-        query_lower = query.lower()
-        
-        # List of common ServiceNow features
-        features = [
-            'virtual agent', 'now assist', 'predictive intelligence', 
-            'workflow', 'performance analytics', 'ai search', 'knowledge graph',
-            'chatbot', 'automation', 'cmdb', 'service portal'
-        ]
-        
-        # Find which feature is in the query
-        for feature in features:
-            if feature in query_lower:
-                return feature
-        
-        # If no known feature is found, look for noun phrases
-        # Default to 'virtual agent' for our specific use case
-        return 'virtual agent'
+        return _feature_for_query(query)
     
     def _extract_tables(self, content_list: List[str]) -> List[Dict[str, Any]]:
         """
@@ -120,9 +240,13 @@ class LicenseAnalyzer:
         
         for content in content_list:
             # Look for table markers in our structured content
-            if "--- Tables ---" in content:
-                table_sections = content.split("--- Tables ---")[1].split("---")[0]
-                raw_tables = re.split(r'Table \d+:', table_sections)
+            start = content.find(_TABLES_MARKER)
+            if start >= 0:
+                # Table text runs up to the next section marker (or the end of the slide)
+                start += len(_TABLES_MARKER)
+                end = content.find("---", start)
+                table_sections = content[start:end] if end >= 0 else content[start:]
+                raw_tables = _TABLE_SPLIT_RE.split(table_sections)
                 
                 for raw_table in raw_tables:
                     if not raw_table.strip():
@@ -138,7 +262,7 @@ class LicenseAnalyzer:
                         tables.append(table_data)
             
             # Also look for capability matrices (which might not be formatted as tables)
-            if "capability matrix" in content.lower() or "feature matrix" in content.lower():
+            if _MATRIX_RE.search(content):
                 # Extract sections that might contain matrix information
                 matrix_data = self._extract_capability_matrix(content)
                 if matrix_data:
@@ -166,8 +290,8 @@ class LicenseAnalyzer:
         if not has_license_info:
             return None
             
-        # Extract column headers
-        headers = [cell.strip().lower() for cell in rows[0].split('|')]
+        # Extract column headers from the already lowercased header row
+        headers = [cell.strip() for cell in header.split('|')]
         
         # Identify which columns correspond to which license tiers
         tier_columns = {}
@@ -180,9 +304,11 @@ class LicenseAnalyzer:
         if not tier_columns:
             return None
             
-        # Process rows to extract feature information
+        # Process rows to extract feature information; without column separators
+        # no row has availability cells, so there is nothing to split
         features = {}
-        for row in rows[1:]:
+        data_rows = rows[1:] if len(headers) > 1 else ()
+        for row in data_rows:
             cells = [cell.strip() for cell in row.split('|')]
             if len(cells) < len(headers):
                 continue  # Malformed row
@@ -269,22 +395,12 @@ class LicenseAnalyzer:
         Returns:
             List of feature names
         """
-        # Common ServiceNow features to look for
-        common_features = [
-            'virtual agent', 'now assist', 'predictive intelligence', 
-            'workflow', 'performance analytics', 'ai search', 'knowledge graph',
-            'chatbot', 'automation', 'cmdb', 'service portal'
-        ]
-        
-        found_features = []
-        
         # Look for common features in the section
-        for feature in common_features:
-            if feature in section:
-                found_features.append(feature)
+        found = _FEATURE_SCANNER.find(section)
+        found_features = [feature for feature in _FEATURES if feature in found]
         
         # Also look for bullet points which might indicate features
-        bullet_matches = re.findall(r'(?:^|\n)\s*[\•\-\*]\s*(.*?)(?:$|\n)', section)
+        bullet_matches = _BULLET_RE.findall(section)
         for match in bullet_matches:
             if match.strip() and len(match.strip()) > 3:  # Avoid empty or tiny matches
                 found_features.append(match.strip())
@@ -301,17 +417,12 @@ class LicenseAnalyzer:
         Returns:
             True if feature is available, False otherwise
         """
-        # Positive indicators
-        positive = ['yes', 'y', '✓', '✔', 'included', 'available', 'x', 'true']
-        
-        # Negative indicators
-        negative = ['no', 'n', '-', 'not included', 'not available', 'false']
-        
         cell_value = cell_value.lower()
         
-        if any(indicator in cell_value for indicator in positive):
+        # Positive indicators, then negative indicators
+        if _POSITIVE_RE.search(cell_value):
             return True
-        if any(indicator in cell_value for indicator in negative):
+        if _NEGATIVE_RE.search(cell_value):
             return False
             
         # If no clear indicators, check for special cases
@@ -333,8 +444,9 @@ class LicenseAnalyzer:
         Returns:
             Dictionary mapping license tiers to availability
         """
-        # Initialize result with unknown for all tiers
-        result = {tier: None for tier in self.license_tiers}
+        # Initialize result with unknown for all tiers, indexed like self.license_tiers
+        tier_idx = self._tier_idx
+        result: List[Optional[bool]] = [None] * len(self.license_tiers)
         
         # First check tables for structured information
         for table in tables:
@@ -344,73 +456,57 @@ class LicenseAnalyzer:
                     if feature in feature_name or self._are_similar_features(feature, feature_name):
                         # Update result with table data
                         for tier, available in availability.items():
-                            if tier in result:
-                                result[tier] = available
+                            idx = tier_idx.get(tier)
+                            if idx is not None:
+                                result[idx] = available
             
             elif table['type'] == 'tier_features' and 'features_by_tier' in table:
                 # For tier_features, a feature is available if it's in that tier's list
                 for tier, features in table['features_by_tier'].items():
-                    if tier in result:
+                    idx = tier_idx.get(tier)
+                    if idx is not None:
                         for feature_name in features:
                             if feature in feature_name or self._are_similar_features(feature, feature_name):
-                                result[tier] = True
+                                result[idx] = True
         
         # Next, scan content for textual indications
+        patterns, scanner = _tier_statement_patterns(feature, tuple(self.license_tiers))
         for content in content_list:
-            content_lower = content.lower()
+            # Look for clear statements about feature availability in specific tiers,
+            # all statements in one pass over the slide
+            found = [patterns[pattern] for pattern in scanner.find(content.lower())]
             
-            # Look for clear statements about feature availability in specific tiers
-            for tier in self.license_tiers:
-                # Positive patterns
-                positive_patterns = [
-                    f"{feature} is included in {tier}",
-                    f"{feature} is available in {tier}",
-                    f"{tier} includes {feature}",
-                    f"{tier} license includes {feature}"
-                ]
-                
-                # Negative patterns
-                negative_patterns = [
-                    f"{feature} is not included in {tier}",
-                    f"{feature} is not available in {tier}",
-                    f"{tier} does not include {feature}",
-                    f"{tier} license does not include {feature}"
-                ]
-                
-                for pattern in positive_patterns:
-                    if pattern in content_lower:
-                        result[tier] = True
-                
-                for pattern in negative_patterns:
-                    if pattern in content_lower:
-                        result[tier] = False
+            # Negative statements win over positive ones in the same slide
+            for idx, available in found:
+                if available:
+                    result[idx] = True
+            for idx, available in found:
+                if not available:
+                    result[idx] = False
+        
+        # Nothing to infer when every tier is already known
+        if None not in result:
+            return dict(zip(self.license_tiers, result))
         
         # For any remaining unknowns, apply knowledge inferences
         # In ServiceNow, if a feature exists in a lower tier, it exists in all higher tiers
-        has_any_info = any(v is not None for v in result.values())
-        if has_any_info:
-            # Find the lowest tier where we have info
-            known_tiers = [tier for tier in self.license_tiers if result[tier] is not None]
-            if known_tiers:
-                lowest_known = min(known_tiers, key=lambda t: self.license_tiers.index(t))
-                lowest_idx = self.license_tiers.index(lowest_known)
-                
-                # If this tier has the feature, all higher tiers do too
-                if result[lowest_known]:
-                    for tier in self.license_tiers[lowest_idx:]:
-                        if result[tier] is None:
-                            result[tier] = True
-                
-                # Look for the lowest tier with the feature
-                for tier in self.license_tiers:
-                    if result[tier]:
-                        # All lower tiers don't have it
-                        for lower_tier in self.license_tiers[:self.license_tiers.index(tier)]:
-                            if result[lower_tier] is None:
-                                result[lower_tier] = False
-                        break
-        
-        return result
+        # Find the lowest tier where we have info
+        lowest_idx = next((i for i, v in enumerate(result) if v is not None), None)
+        if lowest_idx is not None:
+            # If this tier has the feature, all higher tiers do too
+            if result[lowest_idx]:
+                for i in range(lowest_idx, len(result)):
+                    if result[i] is None:
+                        result[i] = True
+            
+            # Look for the lowest tier with the feature; all lower tiers don't have it
+            first_available = next((i for i, v in enumerate(result) if v), None)
+            if first_available is not None and None in result:
+                for i in range(first_available):
+                    if result[i] is None:
+                        result[i] = False
+        
+        return dict(zip(self.license_tiers, result))
     
     def _are_similar_features(self, feature1: str, feature2: str) -> bool:
         """
@@ -430,20 +526,9 @@ class LicenseAnalyzer:
         if feature1 in feature2 or feature2 in feature1:
             return True
         
-        # Common abbreviations and variations
-        variations = {
-            'virtual agent': ['va', 'chatbot', 'chat bot', 'conversational bot'],
-            'now assist': ['assist', 'gen ai', 'generative ai', 'llm'],
-            'predictive intelligence': ['pi', 'prediction', 'machine learning', 'ml'],
-            'performance analytics': ['pa', 'analytics', 'reporting']
-        }
-        
-        # Check if features match through variations
-        for base, variants in variations.items():
-            if (feature1 == base or feature1 in variants) and (feature2 == base or feature2 in variants):
-                return True
-        
-        return False
+        # Check if features match through common abbreviations and variations
+        base1 = self._variant_index.get(feature1)
+        return base1 is not None and base1 == self._variant_index.get(feature2)
     
     def generate_license_summary(self, analysis_result: Dict[str, Any], query: str) -> str:
         """
@@ -460,7 +545,7 @@ class LicenseAnalyzer:
         tiers = analysis_result['tiers']
         has_concrete_info = analysis_result['has_concrete_info']
         
-        # Start building the summary
+        # Start building the summary; every fragment goes into one list that is joined once
         summary = []
         
         # Feature name with capitalization
@@ -476,61 +561,59 @@ class LicenseAnalyzer:
             tier_display = tier.capitalize()
             available = tiers.get(tier)
             
-            section = [f"<h3>🔹 {tier_display}</h3>"]
+            summary.append(f"<h3>🔹 {tier_display}</h3>")
             
             if available is True:
-                section.append(f"<p>{feature_display} is <span style='color:green;font-weight:bold;'>included</span> in the {tier_display} license.</p>")
+                summary.append(f"<p>{feature_display} is <span style='color:green;font-weight:bold;'>included</span> in the {tier_display} license.</p>")
                 
                 # Add typical capabilities for this feature in this tier
                 if tier == 'standard':
-                    section.append("<p>Typically includes basic functionality:</p>")
-                    section.append("<ul>")
-                    section.append(f"<li>Basic {feature} capabilities</li>")
-                    section.append(f"<li>Self-service portal integration</li>")
-                    section.append("</ul>")
+                    summary.append("<p>Typically includes basic functionality:</p>")
+                    summary.append("<ul>")
+                    summary.append(f"<li>Basic {feature} capabilities</li>")
+                    summary.append(f"<li>Self-service portal integration</li>")
+                    summary.append("</ul>")
                 elif tier == 'pro':
-                    section.append("<p>Includes enhanced functionality:</p>")
-                    section.append("<ul>")
-                    section.append(f"<li>Advanced {feature} capabilities</li>")
-                    section.append("<li>Integration with other ServiceNow modules</li>")
+                    summary.append("<p>Includes enhanced functionality:</p>")
+                    summary.append("<ul>")
+                    summary.append(f"<li>Advanced {feature} capabilities</li>")
+                    summary.append("<li>Integration with other ServiceNow modules</li>")
                     if 'virtual agent' in feature.lower():
-                        section.append("<li>Pre-built topic templates</li>")
-                        section.append("<li>NLU capabilities</li>")
-                        section.append("<li>Multi-channel support</li>")
-                    section.append("</ul>")
+                        summary.append("<li>Pre-built topic templates</li>")
+                        summary.append("<li>NLU capabilities</li>")
+                        summary.append("<li>Multi-channel support</li>")
+                    summary.append("</ul>")
                 elif tier == 'pro+' or tier == 'enterprise':
-                    section.append("<p>Includes premium functionality:</p>")
-                    section.append("<ul>")
-                    section.append("<li>All Pro capabilities</li>")
+                    summary.append("<p>Includes premium functionality:</p>")
+                    summary.append("<ul>")
+                    summary.append("<li>All Pro capabilities</li>")
                     if 'virtual agent' in feature.lower():
-                        section.append("<li>Advanced AI capabilities</li>")
-                        section.append("<li>LLM integration with Now Assist</li>")
-                        section.append("<li>Knowledge Graph integration</li>")
-                    section.append("<li>Enterprise-grade features</li>")
-                    section.append("</ul>")
+                        summary.append("<li>Advanced AI capabilities</li>")
+                        summary.append("<li>LLM integration with Now Assist</li>")
+                        summary.append("<li>Knowledge Graph integration</li>")
+                    summary.append("<li>Enterprise-grade features</li>")
+                    summary.append("</ul>")
                 
             elif available is False:
-                section.append(f"<p>{feature_display} is <span style='color:red;font-weight:bold;'>not included</span> in the {tier_display} license.</p>")
+                summary.append(f"<p>{feature_display} is <span style='color:red;font-weight:bold;'>not included</span> in the {tier_display} license.</p>")
                 
                 # For Standard tier, offer alternatives
                 if tier == 'standard' and 'virtual agent' in feature.lower():
-                    section.append("<p>Customers on Standard would typically rely on:</p>")
-                    section.append("<ul>")
-                    section.append("<li>Basic self-service portals</li>")
-                    section.append("<li>Standard request forms</li>")
-                    section.append("<li>Knowledge base articles</li>")
-                    section.append("</ul>")
+                    summary.append("<p>Customers on Standard would typically rely on:</p>")
+                    summary.append("<ul>")
+                    summary.append("<li>Basic self-service portals</li>")
+                    summary.append("<li>Standard request forms</li>")
+                    summary.append("<li>Knowledge base articles</li>")
+                    summary.append("</ul>")
             else:
-                section.append(f"<p>No specific information available about {feature_display} in the {tier_display} license.</p>")
-            
-            summary.append('\n'.join(section))
+                summary.append(f"<p>No specific information available about {feature_display} in the {tier_display} license.</p>")
         
         # Add a conclusion
         summary.append("<h3>Summary</h3>")
         if all(v is False for v in tiers.values()):
             summary.append(f"<p>{feature_display} appears to be an add-on purchase not included in standard license tiers.</p>")
-        elif tiers.get('standard') is False and any(tiers.get(t) is True for t in ['pro', 'pro+', 'enterprise']):
-            min_tier = next((t for t in ['pro', 'pro+', 'enterprise'] if tiers.get(t) is True), None)
+        elif tiers.get('standard') is False:
+            min_tier = next((t for t in _UPGRADE_TIERS if tiers.get(t) is True), None)
             if min_tier:
                 summary.append(f"<p>{feature_display} requires at minimum a <strong>{min_tier.capitalize()}</strong> license.</p>")
         
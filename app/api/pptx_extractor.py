@@ -1,8 +1,23 @@
 import os
 from pptx import Presentation
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, Iterator, List, Tuple
 import re
 
+# Bulleted or numbered list item at the start of a line
+_BULLET_RE = re.compile(r'^\s*(?:[\•\-\*]|\d+[\.\)])\s')
+
+# Metadata keys and the patterns whose matches fill them
+_METADATA_PATTERNS = [
+    (re.compile(r'\b(standard|pro|enterprise|pro\+)\b'), 'license_tier'),
+    (re.compile(r'\b(itsm|csx|hrsd|itom)\b'), 'product_line'),
+    (re.compile(r'\b(virtual agent|now assist|ai|workflow)\b'), 'feature_category')
+]
+
+# Slides mentioning one of each are comparison charts (substring checks: a few
+# str.__contains__ scans beat a compiled alternation on slide-sized text)
+_COMPARISON_TERMS = ('compare', 'vs', 'versus')
+_LICENSE_TERMS = ('edition', 'license', 'tier')
+
 class PPTXExtractor:
     """Class to extract text content from PowerPoint files with improved structure preservation."""
     
@@ -22,6 +37,15 @@ class PPTXExtractor:
         Returns:
             Dictionary mapping slide identifiers to slide content
         """
+        return dict(self.iter_slides())
+    
+    def iter_slides(self) -> Iterator[Tuple[str, str]]:
+        """
+        Extract slides one at a time, so callers can process them while extraction continues.
+        
+        Returns:
+            Iterator of (slide identifier, slide content) tuples for slides with content
+        """
         if not os.path.exists(self.file_path):
             raise FileNotFoundError(f"PowerPoint file not found: {self.file_path}")
         
@@ -30,17 +54,13 @@ class PPTXExtractor:
         except Exception as e:
             raise ValueError(f"Error opening PowerPoint file: {str(e)}")
         
-        content = {}
-        
         for i, slide in enumerate(presentation.slides):
             slide_id = f"slide_{i+1}"
             slide_text = self._extract_slide_text_with_structure(slide)
             
             # Only include slides with actual content
             if slide_text.strip():
-                content[slide_id] = slide_text
-        
-        return content
+                yield slide_id, slide_text
     
     def _extract_slide_text(self, slide) -> str:
         """
@@ -81,9 +101,11 @@ class PPTXExtractor:
         text_parts = []
         slide_title = ""
         
-        # Extract title if present (store separately)
-        if slide.shapes.title and slide.shapes.title.text:
-            slide_title = slide.shapes.title.text.strip()
+        # Extract title if present (store separately); looked up once since
+        # slide.shapes.title searches all placeholders on each access
+        title_shape = slide.shapes.title
+        if title_shape and title_shape.text:
+            slide_title = title_shape.text.strip()
             text_parts.append(f"Title: {slide_title}")
         
         # Look for tables and extract them with structure
@@ -93,7 +115,7 @@ class PPTXExtractor:
         
         for shape in slide.shapes:
             # Skip the title shape that we already processed
-            if slide.shapes.title and shape == slide.shapes.title:
+            if title_shape and shape == title_shape:
                 continue
                 
             # Check if it's a table
@@ -103,9 +125,9 @@ class PPTXExtractor:
                     tables.append(table_data)
                 continue
                 
-            # Extract text from shape
-            if hasattr(shape, "text") and shape.text.strip():
-                shape_text = shape.text.strip()
+            # Extract text from shape (the text property is rebuilt from XML on each access)
+            shape_text = getattr(shape, "text", "").strip()
+            if shape_text:
                 
                 # Check if text appears to be a bulleted list
                 if self._is_bullet_list(shape_text):
@@ -178,13 +200,8 @@ class PPTXExtractor:
             return False
             
         # Check for bullet patterns
-        bullet_patterns = [r'^\s*[\•\-\*]\s', r'^\s*\d+[\.\)]\s']
-        bullet_count = 0
+        bullet_count = sum(1 for line in lines if _BULLET_RE.match(line))
         
-        for line in lines:
-            if any(re.match(pattern, line) for pattern in bullet_patterns):
-                bullet_count += 1
-                
         # If more than half the lines match a bullet pattern, consider it a list
         return bullet_count >= len(lines) / 2
     
@@ -213,22 +230,16 @@ class PPTXExtractor:
         """
         metadata = {}
         
-        # Check for license or product information
-        license_patterns = [
-            (r'\b(standard|pro|enterprise|pro\+)\b', 'license_tier'),
-            (r'\b(itsm|csx|hrsd|itom)\b', 'product_line'),
-            (r'\b(virtual agent|now assist|ai|workflow)\b', 'feature_category')
-        ]
-        
         combined_text = (title + " " + content).lower()
         
-        for pattern, meta_key in license_patterns:
-            matches = re.findall(pattern, combined_text)
+        # Check for license or product information
+        for pattern, meta_key in _METADATA_PATTERNS:
+            matches = pattern.findall(combined_text)
             if matches:
                 metadata[meta_key] = ", ".join(set(matches))
         
         # Detect if it's a comparison chart
-        if ('compare' in combined_text or 'vs' in combined_text or 'versus' in combined_text) and any(term in combined_text for term in ['edition', 'license', 'tier']):
+        if any(term in combined_text for term in _COMPARISON_TERMS) and any(term in combined_text for term in _LICENSE_TERMS):
             metadata['content_type'] = 'comparison_chart'
         
         # Detect capability matrices
@@ -2,63 +2,140 @@ import os
 import json
 import time
 import re
+import atexit
+import logging
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Dict, Any, Optional
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib json module
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+_WS_RE = re.compile(r'\s+')
+
+# One row per normalized query, so a write touches a single B-tree page
+# instead of rewriting the whole cache file
+_SQL_CREATE = '''
+CREATE TABLE IF NOT EXISTS queries (
+    normalized_query TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    timestamp REAL NOT NULL
+)
+'''
+_SQL_CREATE_INDEX = "CREATE INDEX IF NOT EXISTS idx_queries_timestamp ON queries(timestamp)"
+_SQL_GET = "SELECT result, timestamp FROM queries WHERE normalized_query = ? AND timestamp > ?"
+_SQL_PUT = "INSERT OR REPLACE INTO queries (normalized_query, result, timestamp) VALUES (?, ?, ?)"
+_SQL_DELETE = "DELETE FROM queries WHERE normalized_query = ?"
+_SQL_PURGE = "DELETE FROM queries WHERE timestamp <= ?"
+
+# Most recently used entries kept in memory in front of the database
+_MEMORY_ENTRIES = 512
+
+# Fraction of cache writes that also delete expired rows
+_PURGE_PROBABILITY = 0.01
+
+def _dumps(value: Any) -> str:
+    """Serialize a value to a JSON string."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(value, ensure_ascii=False)
+
+def _loads(data) -> Any:
+    """Parse a JSON string or bytes."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+@lru_cache(maxsize=4096)
+def _normalize_query(query: str) -> str:
+    """
+    Normalize a query for consistent caching.
+    
+    Args:
+        query: The query to normalize
+    
+    Returns:
+        Normalized query string
+    """
+    # Convert to lowercase and remove extra whitespace
+    query = query.lower().strip()
+    query = _WS_RE.sub(' ', query)
+    return query
+
 class QueryCache:
     """Class to manage cached query results."""
     
+    __slots__ = ('cache_file', 'db_path', 'expiry_time', '_lock', '_closed', '_conn', '_memory')
+    
     def __init__(self, cache_file: str = "query_cache.json", expiry_time: int = 86400):
         """
         Initialize the query cache.
         
         Args:
-            cache_file: Path to the cache file
+            cache_file: Path to the legacy JSON cache file; entries are stored in
+                a SQLite database next to it with a .sqlite extension
             expiry_time: Time in seconds before a cache entry expires (default: 24 hours)
         """
         self.cache_file = cache_file
+        self.db_path = os.path.splitext(cache_file)[0] + ".sqlite"
         self.expiry_time = expiry_time
-        self.cache = self.load_cache()
-    
-    def load_cache(self) -> Dict[str, Any]:
-        """Load cache from disk."""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache = json.load(f)
-                # Remove expired entries
-                current_time = time.time()
-                cache = {
-                    k: v for k, v in cache.items()
-                    if 'timestamp' not in v or current_time - v['timestamp'] < self.expiry_time
-                }
-                return cache
-            except Exception as e:
-                print(f"Error loading cache: {str(e)}")
-                return {}
-        return {}
+        
+        self._lock = threading.Lock()
+        self._closed = False
+        # normalized query -> (timestamp, result), least recently used first
+        self._memory = OrderedDict()
+        is_new = not os.path.exists(self.db_path)
+        self._conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SQL_CREATE)
+        self._conn.execute(_SQL_CREATE_INDEX)
+        
+        if is_new:
+            self._import_json_cache()
+        self._conn.execute(_SQL_PURGE, (time.time() - self.expiry_time,))
+        atexit.register(self.close)
     
-    def save_cache(self):
-        """Save cache to disk."""
+    def _import_json_cache(self):
+        """Copy entries from an existing JSON cache file into the database."""
+        if not os.path.exists(self.cache_file):
+            return
         try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
+            with open(self.cache_file, 'rb') as f:
+                cache = _loads(f.read())
+            now = time.time()
+            rows = [
+                (k, _dumps(v['result']), v.get('timestamp', now))
+                for k, v in cache.items()
+                if 'result' in v
+            ]
+            self._conn.execute("BEGIN")
+            self._conn.executemany(_SQL_PUT, rows)
+            self._conn.execute("COMMIT")
+            logger.info("Imported %d cached queries from %s", len(rows), self.cache_file)
         except Exception as e:
-            print(f"Error saving cache: {str(e)}")
+            logger.error("Error importing cache: %s", e)
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
     
-    def _normalize_query(self, query: str) -> str:
-        """
-        Normalize a query for consistent caching.
-        
-        Args:
-            query: The query to normalize
-            
-        Returns:
-            Normalized query string
-        """
-        # Convert to lowercase and remove extra whitespace
-        query = query.lower().strip()
-        query = re.sub(r'\s+', ' ', query)
-        return query
+    def flush(self):
+        """Make sure all writes are on disk (each write is already committed)."""
+        with self._lock:
+            if not self._closed:
+                self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._conn.close()
     
     def get(self, query: str, force_refresh: bool = False) -> Optional[Dict[str, Any]]:
         """
@@ -67,27 +144,33 @@ class QueryCache:
         Args:
             query: The query to look up
             force_refresh: If True, ignores cache and returns None
-            
+        
         Returns:
             Cached result or None if not found or expired
         """
         if force_refresh:
             return None
+        
+        normalized_query = _normalize_query(query)
+        cutoff = time.time() - self.expiry_time
+        with self._lock:
+            entry = self._memory.get(normalized_query)
+            if entry is not None and entry[0] > cutoff:
+                self._memory.move_to_end(normalized_query)
+                logger.debug("Query cache hit for: %s", query)
+                return entry[1]
             
-        normalized_query = self._normalize_query(query)
-        if normalized_query in self.cache:
-            cache_entry = self.cache[normalized_query]
-            # Check if entry has expired
-            if 'timestamp' in cache_entry:
-                current_time = time.time()
-                if current_time - cache_entry['timestamp'] < self.expiry_time:
-                    print(f"Query cache hit for: {query}")
-                    return cache_entry['result']
-                else:
-                    # Remove expired entry
-                    del self.cache[normalized_query]
-                    self.save_cache()
-        return None
+            # Expired rows simply don't match; they are purged at startup and by set()
+            row = self._conn.execute(
+                _SQL_GET, (normalized_query, cutoff)
+            ).fetchone()
+            if row is None:
+                self._memory.pop(normalized_query, None)
+                return None
+            timestamp, result = row[1], _loads(row[0])
+            self._remember(normalized_query, timestamp, result)
+        logger.debug("Query cache hit for: %s", query)
+        return result
     
     def set(self, query: str, result: Dict[str, Any]):
         """
@@ -97,13 +180,24 @@ class QueryCache:
             query: The query to cache
             result: The result to cache
         """
-        normalized_query = self._normalize_query(query)
-        self.cache[normalized_query] = {
-            'result': result,
-            'timestamp': time.time()
-        }
-        self.save_cache()
-        
+        normalized_query = _normalize_query(query)
+        payload = _dumps(result)
+        timestamp = time.time()
+        with self._lock:
+            self._conn.execute(_SQL_PUT, (normalized_query, payload, timestamp))
+            self._remember(normalized_query, timestamp, result)
+            
+            # Occasionally purge expired rows; the timestamp index means only those rows are visited
+            if random.random() < _PURGE_PROBABILITY:
+                self._conn.execute(_SQL_PURGE, (timestamp - self.expiry_time,))
+    
+    def _remember(self, normalized_query: str, timestamp: float, result: Dict[str, Any]):
+        """Add an entry to the in-memory tier, evicting the least recently used one if full."""
+        self._memory[normalized_query] = (timestamp, result)
+        self._memory.move_to_end(normalized_query)
+        if len(self._memory) > _MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+    
     def clear(self, query: Optional[str] = None):
         """
         Clear specific query from cache or entire cache if query is None.
@@ -111,10 +205,11 @@ class QueryCache:
         Args:
             query: Specific query to clear, or None to clear all
         """
-        if query is None:
-            self.cache = {}
-        else:
-            normalized_query = self._normalize_query(query)
-            if normalized_query in self.cache:
-                del self.cache[normalized_query]
-        self.save_cache() 
\ No newline at end of file
+        with self._lock:
+            if query is None:
+                self._conn.execute("DELETE FROM queries")
+                self._memory.clear()
+            else:
+                normalized_query = _normalize_query(query)
+                self._conn.execute(_SQL_DELETE, (normalized_query,))
+                self._memory.pop(normalized_query, None)
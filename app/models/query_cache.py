@@ -1,46 +1,178 @@
 import os
+import re
 import json
+import time
+import hashlib
+import atexit
 import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib json module
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# One row per normalized query, keyed by its hash: writes and deletes touch a
+# single row instead of rewriting a file
+_SQL_CREATE = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    result BLOB NOT NULL,
+    ts REAL NOT NULL
+)
+'''
+_SQL_CREATE_INDEX = "CREATE INDEX IF NOT EXISTS idx_cache_ts ON cache(ts)"
+_SQL_GET = "SELECT result, ts FROM cache WHERE key = ?"
+_SQL_PUT = "INSERT OR REPLACE INTO cache (key, result, ts) VALUES (?, ?, ?)"
+_SQL_DELETE = "DELETE FROM cache WHERE key = ?"
+_SQL_CLEANUP = "DELETE FROM cache WHERE ts <= ?"
+# Keeps the newest max_rows entries; the ts index orders the scan
+_SQL_TRIM = "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY ts DESC LIMIT -1 OFFSET ?)"
+
+# Writes between purges of expired and surplus rows
+_TRIM_INTERVAL = 100
+
+# Sentence punctuation that doesn't change what is being asked; characters such
+# as '+', '#', '/', '.' and '-' are kept ("Pro" and "Pro+" are different tiers)
+_PUNCT_RE = re.compile(r'[?!,;:"\'()\[\]{}]')
+
+# Salts the key hash; bump it whenever normalization changes so entries stored
+# under an older, looser normalization are never served
+_KEY_PERSON = b'moad-query-v2'
+
+@lru_cache(maxsize=4096)
+def _key(query: str) -> str:
+    """
+    Cache key for a query: equivalent phrasings that differ only in case,
+    whitespace, sentence punctuation or a trailing period share a key.
+    """
+    normalized = ' '.join(_PUNCT_RE.sub('', query.lower()).split()).rstrip('.')
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16, person=_KEY_PERSON).hexdigest()
+
+def _dumps(value: Any) -> bytes:
+    """Serialize a cached result to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+def _loads(data: bytes) -> Any:
+    """Parse JSON bytes."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
 class QueryCache:
     """A simple cache for storing query results."""
     
-    def __init__(self, cache_file: str = "query_cache.json", max_age_hours: float = 24):
+    __slots__ = ('cache_file', 'db_path', '_max_age_seconds', 'max_entries', 'max_rows', '_memory', '_writes', '_lock', '_closed', '_conn')
+    
+    def __init__(self, cache_file: str = "query_cache.json", max_age_hours: float = 24, max_entries: int = 1024, max_rows: int = 10000):
         """
         Initialize the query cache.
         
         Args:
-            cache_file: Path to the cache file
+            cache_file: Path to the legacy JSON cache file; entries are stored in
+                a SQLite database next to it with a .sqlite extension
             max_age_hours: Maximum age of cache entries in hours
+            max_entries: Maximum number of recently used entries kept in memory
+            max_rows: Maximum number of entries kept in the database
         """
         self.cache_file = cache_file
-        self.max_age = timedelta(hours=max_age_hours)
-        self.cache = self._load_cache()
+        self.db_path = os.path.splitext(cache_file)[0] + ".sqlite"
+        self._max_age_seconds = max_age_hours * 3600
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._writes = 0
+        
+        # Recently used entries as key -> (timestamp, result, serialized result),
+        # least recently used first
+        self._memory = OrderedDict()
+        
+        # Ensure the directory exists
+        cache_dir = os.path.dirname(self.db_path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        
+        self._lock = threading.Lock()
+        self._closed = False
+        is_new = not os.path.exists(self.db_path)
+        self._conn = self._connect()
+        
+        # Tables from before entries were keyed by normalized-query hash can't be reused
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(cache)")]
+        if columns and 'key' not in columns:
+            self._conn.execute("DROP TABLE cache")
+        self._conn.execute(_SQL_CREATE)
+        self._conn.execute(_SQL_CREATE_INDEX)
+        if is_new:
+            self._import_json_cache()
+        self._purge(time.time())
+        atexit.register(self.close)
         logger.info(f"Query cache initialized with max age of {max_age_hours} hours")
     
+    def key(self, query: str) -> str:
+        """
+        Get the cache key for a query; equivalent phrasings share a key.
+        
+        Args:
+            query: The query string
+            
+        Returns:
+            The key the query's entry is stored under
+        """
+        return _key(query)
+    
     def get(self, query: str) -> Optional[Dict[str, Any]]:
         """
         Get a cached result for a query.
         
         Args:
             query: The query string
-            
+        
         Returns:
             Cached result or None if not found or expired
         """
-        if query in self.cache:
-            entry = self.cache[query]
+        entry = self._lookup(query)
+        return entry[1] if entry is not None else None
+    
+    def get_bytes(self, query: str) -> Optional[bytes]:
+        """
+        Get a cached result for a query as the JSON bytes it was stored as.
+        
+        Args:
+            query: The query string
+        
+        Returns:
+            Serialized result or None if not found or expired
+        """
+        entry = self._lookup(query)
+        return entry[2] if entry is not None else None
+    
+    def _lookup(self, query: str) -> Optional[tuple]:
+        """Find the live (timestamp, result, serialized result) entry for a query."""
+        key = _key(query)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._conn.execute(_SQL_GET, (key,)).fetchone()
+                if row is None:
+                    return None
+                entry = (row[1], _loads(row[0]), bytes(row[0]))
+            
             # Check if entry is expired
-            timestamp = datetime.fromtimestamp(entry.get('timestamp', 0))
-            if datetime.now() - timestamp < self.max_age:
-                logger.debug(f"Cache hit for query: {query}")
-                return entry.get('result')
-            else:
-                logger.debug(f"Cache entry expired for query: {query}")
+            if time.time() - entry[0] < self._max_age_seconds:
+                self._remember(key, entry)
+                logger.debug("Cache hit for query: %s", query)
+                return entry
+            
+            # Drop the expired entry now rather than waiting for cleanup()
+            self._memory.pop(key, None)
+            self._conn.execute(_SQL_DELETE, (key,))
+        logger.debug("Cache entry expired for query: %s", query)
         return None
     
     def set(self, query: str, result: Dict[str, Any]) -> None:
@@ -51,12 +183,31 @@ class QueryCache:
             query: The query string
             result: The result to cache
         """
-        self.cache[query] = {
-            'result': result,
-            'timestamp': datetime.now().timestamp()
-        }
-        self._save_cache()
-        logger.debug(f"Cached result for query: {query}")
+        payload = _dumps(result)
+        key = _key(query)
+        timestamp = time.time()
+        with self._lock:
+            self._conn.execute(_SQL_PUT, (key, payload, timestamp))
+            self._remember(key, (timestamp, result, payload))
+            
+            # Nothing else expires rows, so bound the table every few writes
+            self._writes += 1
+            if self._writes >= _TRIM_INTERVAL:
+                self._writes = 0
+                self._purge(timestamp)
+        logger.debug("Cached result for query: %s", query)
+    
+    def _purge(self, now: float) -> None:
+        """Delete expired rows and the oldest rows beyond max_rows (caller holds the lock)."""
+        self._conn.execute(_SQL_CLEANUP, (now - self._max_age_seconds,))
+        self._conn.execute(_SQL_TRIM, (self.max_rows,))
+    
+    def _remember(self, key: str, entry: tuple) -> None:
+        """Keep an entry in memory as most recently used, evicting the oldest beyond max_entries."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
     
     def delete(self, query: str) -> bool:
         """
@@ -64,55 +215,80 @@ class QueryCache:
         
         Args:
             query: The query string to delete
-            
+        
         Returns:
             True if the query was deleted, False if it wasn't in the cache
         """
-        if query in self.cache:
-            del self.cache[query]
-            self._save_cache()
-            logger.debug(f"Deleted cache entry for query: {query}")
-            return True
-        return False
+        key = _key(query)
+        with self._lock:
+            self._memory.pop(key, None)
+            deleted = self._conn.execute(_SQL_DELETE, (key,)).rowcount > 0
+        if deleted:
+            logger.debug("Deleted cache entry for query: %s", query)
+        return deleted
     
     def clear(self) -> None:
         """
         Clear the entire cache.
         """
-        self.cache = {}
-        self._save_cache()
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM cache")
         logger.info("Cleared entire query cache")
     
-    def _load_cache(self) -> Dict[str, Any]:
+    def flush(self) -> None:
+        """Checkpoint the write-ahead log; every change is already committed."""
+        with self._lock:
+            if not self._closed:
+                self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._conn.close()
+    
+    def reopen(self) -> None:
         """
-        Load the cache from disk.
+        Open a new database connection after close().
         
-        Returns:
-            The loaded cache as a dictionary
-        """
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                    logger.debug(f"Loaded {len(cache_data)} entries from cache file")
-                    return cache_data
-            except Exception as e:
-                logger.error(f"Error loading cache: {str(e)}")
-        return {}
-    
-    def _save_cache(self) -> None:
-        """Save the cache to disk."""
+        SQLite connections must not be used across fork(), so a process that
+        forks workers closes the cache first and each worker reopens it.
+        """
+        with self._lock:
+            if not self._closed:
+                return
+            self._conn = self._connect()
+            self._closed = False
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the cache database in autocommit and WAL mode."""
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    def _import_json_cache(self) -> None:
+        """Copy the entries of an existing JSON cache file into a new database."""
+        if not os.path.exists(self.cache_file):
+            return
         try:
-            # Ensure the directory exists
-            cache_dir = os.path.dirname(self.cache_file)
-            if cache_dir and not os.path.exists(cache_dir):
-                os.makedirs(cache_dir)
-                
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
-            logger.debug(f"Saved {len(self.cache)} entries to cache file")
+            with open(self.cache_file, 'rb') as f:
+                cache_data = _loads(f.read())
+            rows = [
+                (_key(query), _dumps(entry.get('result')), entry.get('timestamp', 0))
+                for query, entry in cache_data.items()
+            ]
+            self._conn.execute("BEGIN")
+            self._conn.executemany(_SQL_PUT, rows)
+            self._conn.execute("COMMIT")
+            logger.info(f"Imported {len(rows)} entries from {self.cache_file}")
         except Exception as e:
-            logger.error(f"Error saving cache: {str(e)}")
+            logger.error(f"Error importing cache: {str(e)}")
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
     
     def cleanup(self) -> int:
         """
@@ -121,19 +297,13 @@ class QueryCache:
         Returns:
             Number of entries removed
         """
-        now = datetime.now()
-        expired_keys = []
+        cutoff = time.time() - self._max_age_seconds
+        with self._lock:
+            removed = self._conn.execute(_SQL_CLEANUP, (cutoff,)).rowcount
+            for key in [k for k, entry in self._memory.items() if entry[0] <= cutoff]:
+                del self._memory[key]
         
-        for key, entry in self.cache.items():
-            timestamp = datetime.fromtimestamp(entry.get('timestamp', 0))
-            if now - timestamp >= self.max_age:
-                expired_keys.append(key)
-                
-        for key in expired_keys:
-            del self.cache[key]
-            
-        if expired_keys:
-            self._save_cache()
-            logger.info(f"Cleaned up {len(expired_keys)} expired cache entries")
-            
-        return len(expired_keys) 
\ No newline at end of file
+        if removed:
+            logger.info(f"Cleaned up {removed} expired cache entries")
+        
+        return removed
@@ -1,5 +1,7 @@
 import time
-from flask import Blueprint, request, jsonify, render_template
+import gzip
+import json
+from flask import Blueprint, Response, request, jsonify, render_template, stream_with_context
 from app.services.query_service import QueryService
 import logging
 
@@ -14,6 +16,9 @@ api_bp = Blueprint('api', __name__, url_prefix='/api')
 # Initialize query service
 query_service = QueryService()
 
+# Responses smaller than this aren't worth compressing
+GZIP_MIN_SIZE = 500
+
 @main_bp.route('/')
 def index():
     """Render the main page"""
@@ -41,9 +46,20 @@ def query():
         return jsonify({'error': 'No query provided'}), 400
     
     try:
+        # Cache hits are sent as the stored JSON with the per-request fields appended
+        cache_missed = False
+        if not bypass_cache:
+            cached_json = query_service.get_cached_json(query)
+            cache_missed = cached_json is None
+            if cached_json and cached_json.endswith(b'}') and len(cached_json) > 2:
+                processing_time = time.time() - start_time
+                logger.info(f"Query served from cache in {processing_time:.2f}s")
+                body = cached_json[:-1] + b',"processing_time":%.2f,"cached":true}' % processing_time
+                return Response(body, mimetype='application/json')
+        
         # Process the query
         logger.info(f"Processing query: {query} (bypass_cache={bypass_cache})")
-        result, cached = query_service.process_query(query, bypass_cache)
+        result, cached = query_service.process_query(query, bypass_cache, skip_cache_lookup=cache_missed)
         
         # Build response
         processing_time = time.time() - start_time
@@ -64,6 +80,62 @@ def query():
             'processing_time': time.time() - start_time
         }), 500
 
+@api_bp.route('/query/stream', methods=['GET'])
+def query_stream():
+    """
+    Process a query about ServiceNow MOAD, streaming the answer as server-sent events
+    
+    Query parameters:
+    - query: The question to ask about ServiceNow
+    - bypass_cache: Whether to bypass the cache (optional, default=False)
+    
+    Returns:
+    - text/event-stream of JSON events: sources first, then summary deltas, then done
+    """
+    start_time = time.time()
+    
+    # Get query parameters
+    query = request.args.get('query')
+    bypass_cache = request.args.get('bypass_cache', 'false').lower() == 'true'
+    
+    if not query:
+        return jsonify({'error': 'No query provided'}), 400
+    
+    def generate():
+        try:
+            logger.info(f"Streaming query: {query} (bypass_cache={bypass_cache})")
+            for event in query_service.process_query_stream(query, bypass_cache):
+                yield f"data: {json.dumps(event)}\n\n"
+            
+            processing_time = time.time() - start_time
+            logger.info(f"Query streamed in {processing_time:.2f}s")
+            yield f"data: {json.dumps({'done': True, 'processing_time': round(processing_time, 2)})}\n\n"
+        
+        except Exception as e:
+            logger.error(f"Error streaming query: {str(e)}", exc_info=True)
+            yield f"data: {json.dumps({'error': f'Failed to process query: {str(e)}'})}\n\n"
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
+@api_bp.after_request
+def compress_response(response):
+    """Gzip JSON responses when the client accepts it; summaries and sources compress well"""
+    if (response.is_streamed
+            or response.status_code < 200
+            or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers
+            or 'gzip' not in request.headers.get('Accept-Encoding', '').lower()):
+        return response
+    
+    data = response.get_data()
+    if len(data) < GZIP_MIN_SIZE:
+        return response
+    
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
 def init_app(app):
     """Register blueprints with the Flask app"""
     app.register_blueprint(main_bp)
@@ -1,8 +1,18 @@
 import os
+import re
 import json
 import time
+import heapq
+from collections import Counter, defaultdict
 from typing import List, Dict, Any
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib json module
+    orjson = None
+
+_TOKEN_RE = re.compile(r"\w+")
+
 class ContentService:
     """Service for managing content extracted from the MOAD PowerPoint."""
     
@@ -18,6 +28,12 @@ class ContentService:
         self.json_path = json_path
         self.moad_content = {}
         
+        # Inverted index: token -> {slide_id: term frequency}, plus each slide's load order
+        # and its lowercased content for phrase checks
+        self._tokens: Dict[str, Dict[str, int]] = {}
+        self._slide_order: Dict[str, int] = {}
+        self._content_lower: Dict[str, str] = {}
+        
     def load_content(self) -> Dict[str, Any]:
         """
         Load content from cache or extract from PowerPoint.
@@ -31,8 +47,9 @@ class ContentService:
         # Check if the JSON cache exists
         if os.path.exists(self.json_path):
             try:
-                with open(self.json_path, 'r', encoding='utf-8') as f:
-                    self.moad_content = json.load(f)
+                with open(self.json_path, 'rb') as f:
+                    data = f.read()
+                self.moad_content = orjson.loads(data) if orjson is not None else json.loads(data)
                 print(f"Loaded content from cache: {len(self.moad_content)} slides")
             except Exception as e:
                 print(f"Error loading from cache: {str(e)}")
@@ -41,6 +58,7 @@ class ContentService:
             # Extract from PowerPoint if cache doesn't exist
             self._extract_content_from_pptx()
         
+        self._build_index()
         print(f"Content loading completed in {time.time() - start_time:.2f} seconds")
         return self.moad_content
     
@@ -55,8 +73,15 @@ class ContentService:
             self.moad_content = extractor.extract_all_slides()
             
             # Save to cache for future use
-            with open(self.json_path, 'w', encoding='utf-8') as f:
-                json.dump(self.moad_content, f, ensure_ascii=False, indent=2)
+            if orjson is not None:
+                data = orjson.dumps(self.moad_content)
+            else:
+                data = json.dumps(self.moad_content, ensure_ascii=False).encode('utf-8')
+            # Write a sibling file and swap it in so a crash never leaves a partial cache
+            tmp_path = self.json_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.json_path)
             
             print(f"Extracted and cached {len(self.moad_content)} slides")
         except Exception as e:
@@ -64,6 +89,18 @@ class ContentService:
             # Initialize with empty content if extraction fails
             self.moad_content = {}
     
+    def _build_index(self):
+        """Build the token -> {slide_id: term frequency} index over the loaded content."""
+        tokens = defaultdict(dict)
+        self._content_lower = {}
+        for slide_id, content in self.moad_content.items():
+            content_lower = content.lower()
+            self._content_lower[slide_id] = content_lower
+            for token, tf in Counter(_TOKEN_RE.findall(content_lower)).items():
+                tokens[token][slide_id] = tf
+        self._tokens = dict(tokens)
+        self._slide_order = {slide_id: i for i, slide_id in enumerate(self.moad_content)}
+    
     def get_relevant_slides(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
         """
         Get slides relevant to the given query.
@@ -78,30 +115,34 @@ class ContentService:
         # For now, this is a simple keyword search
         # This could be extended with vector search or other techniques
         relevant_slides = []
-        query_terms = set(query.lower().split())
+        tokens = _TOKEN_RE.findall(query.lower())
+        query_terms = set(tokens)
         
-        # Calculate relevance scores for each slide
-        relevance_scores = {}
-        for slide_id, content in self.moad_content.items():
-            content_lower = content.lower()
-            
-            # Calculate a simple relevance score based on term frequency
-            score = sum(content_lower.count(term) for term in query_terms if term in content_lower)
-            
-            # Add bonus for slides with exact phrases
-            for i in range(len(query_terms) - 1):
-                phrase = ' '.join(list(query_terms)[i:i+2])
+        # Adjacent word pairs in query order, for the exact phrase bonus
+        phrases = [f"{tokens[i]} {tokens[i + 1]}" for i in range(len(tokens) - 1)]
+        
+        # Calculate a simple relevance score based on term frequency,
+        # touching only the slides that contain a query term
+        relevance_scores = defaultdict(int)
+        for term in query_terms:
+            for slide_id, tf in self._tokens.get(term, {}).items():
+                relevance_scores[slide_id] += tf
+        
+        # Add bonus for candidate slides with exact phrases
+        for slide_id in relevance_scores:
+            content_lower = self._content_lower[slide_id]
+            for phrase in phrases:
                 if phrase in content_lower:
-                    score += 5
-            
-            if score > 0:
-                relevance_scores[slide_id] = score
+                    relevance_scores[slide_id] += 5
         
-        # Sort slides by relevance score
-        sorted_slides = sorted(relevance_scores.items(), key=lambda x: x[1], reverse=True)
+        # Take the top slides by relevance score, ties in content order
+        top_slides = heapq.nlargest(
+            max_results, relevance_scores.items(),
+            key=lambda x: (x[1], -self._slide_order[x[0]])
+        )
         
         # Prepare slide data with previews for the top results
-        for slide_id, score in sorted_slides[:max_results]:
+        for slide_id, score in top_slides:
             content = self.moad_content[slide_id]
             
             # Create a content preview (first 100 characters)
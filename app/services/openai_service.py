@@ -1,12 +1,22 @@
 import os
 import json
 import logging
-from typing import Dict, List, Any
-import openai
-from openai import OpenAI
+import threading
+from typing import Dict, Iterator, List, Any, Tuple
+from app.utils.openai_client import get_openai_client
 
 logger = logging.getLogger(__name__)
 
+# Static instructions sent with every query; only the user prompt depends on the
+# query and its sources
+_SYSTEM_PROMPT = """
+        You are a ServiceNow expert providing information about ServiceNow products, licenses, and features.
+        Your task is to answer questions accurately based ONLY on the provided source information.
+        If the information provided doesn't contain an answer, say so clearly.
+        Format your answers in a structured way using markdown and bullet points when appropriate.
+        For license comparisons, use consistent symbols (✓ for included, ✗ for not included) and structure.
+        """
+
 class OpenAIService:
     """Service for interacting with OpenAI API to generate responses"""
     
@@ -14,11 +24,73 @@ class OpenAIService:
         """Initialize the OpenAI service with API key"""
         self.api_key = os.environ.get('OPENAI_API_KEY')
         
+        # Limit how many requests wait on the API at once so a burst of uncached
+        # queries can't tie up every worker thread
+        max_concurrency = int(os.environ.get('OPENAI_MAX_CONCURRENCY', 8))
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        
         if not self.api_key:
+            self.client = None
             logger.warning("OpenAI API key not found in environment variables")
         else:
+            # The process-wide client, so answers and query embeddings reuse
+            # the same keep-alive connections
+            self.client = get_openai_client()
             logger.info("OpenAI service initialized successfully")
     
+    def _build_messages(self, query: str, context: List[Dict[str, Any]]) -> Tuple[List[Dict[str, str]], List[Dict[str, Any]]]:
+        """
+        Build the chat messages for a query and the sources shown with the answer
+        
+        Args:
+            query: The user query
+            context: List of context chunks with content
+        
+        Returns:
+            Tuple of (chat messages, sources information)
+        """
+        # Format context chunks; pieces are joined once instead of
+        # re-copying the growing prompt on every +=
+        context_parts = []
+        sources = []
+        
+        for i, chunk in enumerate(context):
+            # Extract content and metadata for the prompt
+            content = chunk.get('content', '')
+            slide_title = chunk.get('title', f'Source {i+1}')
+            slide_number = chunk.get('slide_number')
+            
+            # Add to formatted context
+            context_parts.append(f"\n--- SOURCE {i+1} ---\nTitle: {slide_title}\n")
+            if slide_number:
+                context_parts.append(f"Slide: {slide_number}\n")
+            context_parts.append(f"Content: {content}\n")
+            
+            # Add to sources for the response
+            sources.append({
+                'title': slide_title,
+                'content': content[:150] + '...' if len(content) > 150 else content,
+                'slide_number': slide_number
+            })
+        formatted_context = "".join(context_parts)
+        
+        # Create user prompt
+        user_prompt = f"""
+        Question: {query}
+        
+        Please provide an accurate answer based ONLY on the following sources:
+        
+        {formatted_context}
+        
+        Answer the question in a concise way, maintaining accuracy and using ONLY the information in these sources.
+        """
+        
+        messages = [
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+        return messages, sources
+    
     def generate_response(self, query: str, context: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Generate a response to a query using context from embeddings
@@ -37,61 +109,16 @@ class OpenAIService:
                     'sources': []
                 }
             
-            # Format context chunks
-            formatted_context = ""
-            sources = []
-            
-            for i, chunk in enumerate(context):
-                # Extract content and metadata for the prompt
-                content = chunk.get('content', '')
-                slide_title = chunk.get('title', f'Source {i+1}')
-                slide_number = chunk.get('slide_number')
-                
-                # Add to formatted context
-                formatted_context += f"\n--- SOURCE {i+1} ---\n"
-                formatted_context += f"Title: {slide_title}\n"
-                if slide_number:
-                    formatted_context += f"Slide: {slide_number}\n"
-                formatted_context += f"Content: {content}\n"
-                
-                # Add to sources for the response
-                sources.append({
-                    'title': slide_title,
-                    'content': content[:150] + '...' if len(content) > 150 else content,
-                    'slide_number': slide_number
-                })
-            
-            # Create system prompt
-            system_prompt = """
-            You are a ServiceNow expert providing information about ServiceNow products, licenses, and features.
-            Your task is to answer questions accurately based ONLY on the provided source information.
-            If the information provided doesn't contain an answer, say so clearly.
-            Format your answers in a structured way using markdown and bullet points when appropriate.
-            For license comparisons, use consistent symbols (✓ for included, ✗ for not included) and structure.
-            """
-            
-            # Create user prompt
-            user_prompt = f"""
-            Question: {query}
-            
-            Please provide an accurate answer based ONLY on the following sources:
-            
-            {formatted_context}
-            
-            Answer the question in a concise way, maintaining accuracy and using ONLY the information in these sources.
-            """
+            messages, sources = self._build_messages(query, context)
             
             # Call OpenAI API
-            client = OpenAI(api_key=self.api_key)
-            response = client.chat.completions.create(
-                model="gpt-4o",  # Or use a different model as needed
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0,  # Keep it factual
-                max_tokens=800
-            )
+            with self._semaphore:
+                response = self.client.chat.completions.create(
+                    model="gpt-4o",  # Or use a different model as needed
+                    messages=messages,
+                    temperature=0,  # Keep it factual
+                    max_tokens=800
+                )
             
             # Extract response
             summary = response.choices[0].message.content.strip()
@@ -107,4 +134,39 @@ class OpenAIService:
             return {
                 'summary': f"An error occurred while generating a response: {str(e)}",
                 'sources': []
-            } 
\ No newline at end of file
+            } 
+    
+    def generate_response_stream(self, query: str, context: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Iterator[str]]:
+        """
+        Generate a response to a query, yielding the answer text as it arrives
+        
+        Args:
+            query: The user query
+            context: List of context chunks with content
+        
+        Returns:
+            Tuple of (sources information, iterator over pieces of the summary)
+        """
+        if not self.api_key:
+            return [], iter(["ERROR: OpenAI API key not configured. Please set the OPENAI_API_KEY environment variable."])
+        
+        messages, sources = self._build_messages(query, context)
+        return sources, self._stream_completion(messages)
+    
+    def _stream_completion(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Yield the text deltas of a streamed chat completion."""
+        try:
+            with self._semaphore:
+                stream = self.client.chat.completions.create(
+                    model="gpt-4o",  # Or use a different model as needed
+                    messages=messages,
+                    temperature=0,  # Keep it factual
+                    max_tokens=800,
+                    stream=True
+                )
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            logger.error(f"Error streaming OpenAI response: {str(e)}", exc_info=True)
+            yield f"An error occurred while generating a response: {str(e)}"
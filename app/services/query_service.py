@@ -1,9 +1,11 @@
 import os
 import logging
+import threading
+from concurrent.futures import Future
 from flask import current_app
 from app.models.query_cache import QueryCache
 from app.services.openai_service import OpenAIService
-from app.utils.moad_embeddings import MOADEmbeddings
+from app.utils.moad_embeddings import get_moad_embeddings
 
 logger = logging.getLogger(__name__)
 
@@ -12,33 +14,86 @@ class QueryService:
     
     def __init__(self):
         """Initialize the query service with embeddings, OpenAI service, and cache"""
-        self.embeddings = MOADEmbeddings()
+        self.embeddings = get_moad_embeddings()
         self.openai_service = OpenAIService()
         
         # Initialize cache with configurable max age
         cache_max_age = current_app.config.get('CACHE_MAX_AGE', 24) if current_app else 24
         self.cache = QueryCache(max_age_hours=cache_max_age)
         
+        # Queries currently being answered, by cache key, so concurrent
+        # requests for the same query share one computation
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        
         logger.info(f"QueryService initialized with cache max age: {cache_max_age} hours")
     
-    def process_query(self, query, bypass_cache=False):
+    def process_query(self, query, bypass_cache=False, skip_cache_lookup=False):
         """
         Process a user query about ServiceNow MOAD
         
         Args:
             query (str): The user's question about ServiceNow
             bypass_cache (bool): If True, bypass cache and force a fresh response
+            skip_cache_lookup (bool): If True, the caller has just missed the cache
+                (e.g. via get_cached_json), so don't look the query up again
             
         Returns:
             tuple: (result_dict, is_cached) - The query result and whether it was from cache
         """
         # Check if we can use a cached result
-        if not bypass_cache:
+        if not (bypass_cache or skip_cache_lookup):
             cached_result = self.cache.get(query)
             if cached_result:
                 logger.info(f"Cache hit for query: {query}")
                 return cached_result, True
         
+        # If the same query is already being answered, wait for that result
+        key = self.cache.key(query)
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not is_owner:
+            logger.info(f"Waiting for in-flight query: {query}")
+            return future.result(), False
+        
+        try:
+            response = self._answer_query(query)
+            future.set_result(response)
+            return response, False
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+    
+    def get_cached_json(self, query):
+        """
+        Get a cached result as serialized JSON, skipping the decode/encode round trip
+        
+        Args:
+            query (str): The user's question about ServiceNow
+            
+        Returns:
+            bytes: The cached {'summary', 'sources'} object as JSON, or None on a miss
+        """
+        return self.cache.get_bytes(query)
+    
+    def _answer_query(self, query):
+        """
+        Answer a query from embeddings context and OpenAI, and cache the result
+        
+        Args:
+            query (str): The user's question about ServiceNow
+            
+        Returns:
+            dict: The query result
+        """
         # No cached result, need to process the query
         logger.info(f"Processing fresh query: {query}")
         
@@ -47,18 +102,62 @@ class QueryService:
         
         if not context:
             logger.warning(f"No relevant context found for query: {query}")
-            return {
+            response = {
                 'summary': "I couldn't find any relevant information about ServiceNow to answer your query.",
                 'sources': []
-            }, False
-        
-        # Generate a response using OpenAI
-        response = self.openai_service.generate_response(query, context)
+            }
+        else:
+            # Generate a response using OpenAI
+            response = self.openai_service.generate_response(query, context)
         
-        # Store the result in cache
+        # Store the result in cache; "no context" answers too, so repeated
+        # unanswerable queries don't redo the context search
         self.cache.set(query, response)
         
-        return response, False
+        return response
+    
+    def process_query_stream(self, query, bypass_cache=False):
+        """
+        Process a user query, yielding the answer as it is generated
+        
+        Args:
+            query (str): The user's question about ServiceNow
+            bypass_cache (bool): If True, bypass cache and force a fresh response
+            
+        Yields:
+            dict: First {'sources': [...], 'cached': bool}, then {'delta': str} pieces of the summary
+        """
+        # A cached result is sent whole
+        if not bypass_cache:
+            cached_result = self.cache.get(query)
+            if cached_result:
+                logger.info(f"Cache hit for query: {query}")
+                yield {'sources': cached_result.get('sources', []), 'cached': True}
+                yield {'delta': cached_result.get('summary', '')}
+                return
+        
+        logger.info(f"Streaming fresh query: {query}")
+        context = self.embeddings.get_relevant_context(query)
+        
+        if not context:
+            logger.warning(f"No relevant context found for query: {query}")
+            yield {'sources': [], 'cached': False}
+            yield {'delta': "I couldn't find any relevant information about ServiceNow to answer your query."}
+            return
+        
+        sources, chunks = self.openai_service.generate_response_stream(query, context)
+        yield {'sources': sources, 'cached': False}
+        
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield {'delta': chunk}
+        
+        # Cache the assembled answer once the stream has finished
+        self.cache.set(query, {
+            'summary': ''.join(parts).strip(),
+            'sources': sources
+        })
     
     def clear_cache(self, query=None):
         """
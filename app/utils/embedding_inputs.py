@@ -0,0 +1,73 @@
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional, fall back to truncating by characters
+    tiktoken = None
+
+# Model the slide embeddings are created with; queries must use the same one
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Embedding model limits: tokens per input and total tokens per request
+_MAX_INPUT_TOKENS = 8191
+_MAX_REQUEST_TOKENS = 300000
+
+# Character cut-off used when tiktoken is not available
+_MAX_INPUT_CHARS = 8000
+
+@lru_cache(maxsize=1)
+def _embedding_encoding():
+    """Return the tokenizer of the embedding model, or None if tiktoken cannot provide it."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(EMBEDDING_MODEL)
+    except Exception:  # e.g. the encoding file cannot be downloaded
+        return None
+
+def truncate_for_embedding(text: str) -> Tuple[str, int]:
+    """
+    Truncate a text to the embedding model's input limit.
+
+    Args:
+        text: Text to embed
+
+    Returns:
+        Tuple of (truncated text, token count). Without tiktoken the text is cut
+        by characters and its length is used as an upper bound on the token count.
+    """
+    encoding = _embedding_encoding()
+    if encoding is None:
+        text = text[:_MAX_INPUT_CHARS]
+        return text, len(text)
+
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) > _MAX_INPUT_TOKENS:
+        tokens = tokens[:_MAX_INPUT_TOKENS]
+        text = encoding.decode(tokens)
+    return text, len(tokens)
+
+def embedding_batches(texts: Iterable[str], max_inputs: int) -> Iterator[List[str]]:
+    """
+    Split texts into embeddings API requests bounded by input count and total tokens.
+
+    Args:
+        texts: Texts to embed, in order
+        max_inputs: Maximum number of inputs per request
+
+    Returns:
+        Iterator over consecutive batches of truncated texts; concatenated, the
+        batches line up one-to-one with the input texts
+    """
+    batch, batch_tokens = [], 0
+    for text in texts:
+        # Truncate to the model's per-input token limit
+        text, num_tokens = truncate_for_embedding(text)
+        if batch and (len(batch) >= max_inputs or batch_tokens + num_tokens > _MAX_REQUEST_TOKENS):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += num_tokens
+    if batch:
+        yield batch
@@ -1,8 +1,27 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pptx import Presentation
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import re
 
+# Bulleted or numbered list item at the start of a line
+_BULLET_RE = re.compile(r'^\s*(?:[\•\-\*]|\d+[\.\)])\s')
+
+# Decks with fewer slides are extracted in-process; worker start-up would outweigh the gain
+_PARALLEL_MIN_SLIDES = 64
+
+# Metadata keys and the patterns whose matches fill them
+_METADATA_PATTERNS = [
+    (re.compile(r'\b(standard|pro|enterprise|pro\+)\b'), 'license_tier'),
+    (re.compile(r'\b(itsm|csx|hrsd|itom)\b'), 'product_line'),
+    (re.compile(r'\b(virtual agent|now assist|ai|workflow)\b'), 'feature_category')
+]
+
+# Slides mentioning one of each are comparison charts (substring checks: a few
+# str.__contains__ scans beat a compiled alternation on slide-sized text)
+_COMPARISON_TERMS = ('compare', 'vs', 'versus')
+_LICENSE_TERMS = ('edition', 'license', 'tier')
+
 class PPTXExtractor:
     """Class to extract text content from PowerPoint files with improved structure preservation."""
     
@@ -39,20 +58,48 @@ class PPTXExtractor:
         except Exception as e:
             raise ValueError(f"Error opening PowerPoint file: {str(e)}")
         
+        n_slides = len(presentation.slides)
+        workers = min(os.cpu_count() or 1, n_slides // (_PARALLEL_MIN_SLIDES // 2) or 1)
+        if n_slides < _PARALLEL_MIN_SLIDES or workers < 2:
+            return dict(self._extract_slides(presentation, 0, n_slides))
+        
+        # Slides are parsed independently, so split the deck into one contiguous range per
+        # worker; each worker reopens the file since slide objects can't be pickled
+        bounds = [n_slides * w // workers for w in range(workers + 1)]
         content = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk in executor.map(_extract_slide_range, [self.file_path] * workers, bounds[:-1], bounds[1:]):
+                content.update(chunk)
+        
+        return content
+    
+    def _extract_slides(self, presentation, start: int, stop: int) -> List[Tuple[str, str]]:
+        """
+        Extract the slides with indices in [start, stop) from an open presentation.
+        
+        Args:
+            presentation: Open python-pptx Presentation
+            start: Index of the first slide to extract
+            stop: Index after the last slide to extract
+            
+        Returns:
+            List of (slide identifier, slide content) tuples for slides with content
+        """
+        content = []
+        slides = presentation.slides
         
-        for i, slide in enumerate(presentation.slides):
+        for i in range(start, stop):
             slide_id = f"slide_{i+1}"
             try:
-                slide_text = self._extract_slide_text_with_structure(slide)
+                slide_text = self._extract_slide_text_with_structure(slides[i])
                 
                 # Only include slides with actual content
                 if slide_text.strip():
-                    content[slide_id] = slide_text
+                    content.append((slide_id, slide_text))
             except Exception as e:
                 print(f"Error extracting content from slide {i+1}: {str(e)}")
                 # Add a simple version for slides that cause errors
-                content[slide_id] = f"[Error extracting content from slide {i+1}]"
+                content.append((slide_id, f"[Error extracting content from slide {i+1}]"))
         
         return content
     
@@ -95,9 +142,11 @@ class PPTXExtractor:
         text_parts = []
         slide_title = ""
         
-        # Extract title if present (store separately)
-        if slide.shapes.title and slide.shapes.title.text:
-            slide_title = slide.shapes.title.text.strip()
+        # Extract title if present (store separately); looked up once since
+        # slide.shapes.title searches all placeholders on each access
+        title_shape = slide.shapes.title
+        if title_shape and title_shape.text:
+            slide_title = title_shape.text.strip()
             text_parts.append(f"Title: {slide_title}")
         
         # Look for tables and extract them with structure
@@ -107,7 +156,7 @@ class PPTXExtractor:
         
         for shape in slide.shapes:
             # Skip the title shape that we already processed
-            if slide.shapes.title and shape == slide.shapes.title:
+            if title_shape and shape == title_shape:
                 continue
             
             # Check if it's a table using the shape type
@@ -122,9 +171,9 @@ class PPTXExtractor:
                 # If we can't access the table property or it raises an error, continue to next shape
                 pass
                 
-            # Extract text from shape
-            if hasattr(shape, "text") and shape.text.strip():
-                shape_text = shape.text.strip()
+            # Extract text from shape (the text property is rebuilt from XML on each access)
+            shape_text = getattr(shape, "text", "").strip()
+            if shape_text:
                 
                 # Check if text appears to be a bulleted list
                 if self._is_bullet_list(shape_text):
@@ -201,13 +250,8 @@ class PPTXExtractor:
             return False
             
         # Check for bullet patterns
-        bullet_patterns = [r'^\s*[\•\-\*]\s', r'^\s*\d+[\.\)]\s']
-        bullet_count = 0
+        bullet_count = sum(1 for line in lines if _BULLET_RE.match(line))
         
-        for line in lines:
-            if any(re.match(pattern, line) for pattern in bullet_patterns):
-                bullet_count += 1
-                
         # If more than half the lines match a bullet pattern, consider it a list
         return bullet_count >= len(lines) / 2
     
@@ -236,26 +280,25 @@ class PPTXExtractor:
         """
         metadata = {}
         
-        # Check for license or product information
-        license_patterns = [
-            (r'\b(standard|pro|enterprise|pro\+)\b', 'license_tier'),
-            (r'\b(itsm|csx|hrsd|itom)\b', 'product_line'),
-            (r'\b(virtual agent|now assist|ai|workflow)\b', 'feature_category')
-        ]
-        
         combined_text = (title + " " + content).lower()
         
-        for pattern, meta_key in license_patterns:
-            matches = re.findall(pattern, combined_text)
+        # Check for license or product information
+        for pattern, meta_key in _METADATA_PATTERNS:
+            matches = pattern.findall(combined_text)
             if matches:
                 metadata[meta_key] = ", ".join(set(matches))
         
         # Detect if it's a comparison chart
-        if ('compare' in combined_text or 'vs' in combined_text or 'versus' in combined_text) and any(term in combined_text for term in ['edition', 'license', 'tier']):
+        if any(term in combined_text for term in _COMPARISON_TERMS) and any(term in combined_text for term in _LICENSE_TERMS):
             metadata['content_type'] = 'comparison_chart'
         
         # Detect capability matrices
         if 'capability' in combined_text and 'matrix' in combined_text:
             metadata['content_type'] = 'capability_matrix'
         
-        return metadata 
\ No newline at end of file
+        return metadata 
+
+def _extract_slide_range(file_path: str, start: int, stop: int) -> List[Tuple[str, str]]:
+    """Process pool worker: open the deck and extract the slides with indices in [start, stop)."""
+    extractor = PPTXExtractor(file_path)
+    return extractor._extract_slides(Presentation(file_path), start, stop)
@@ -1,10 +1,118 @@
 import os
+import re
 import json
+import heapq
 import logging
+import threading
+import numpy as np
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
+from app.utils.embedding_inputs import EMBEDDING_MODEL
+from app.utils.openai_client import get_openai_client
+from app.utils.top_k import top_k_indices
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib json parser
+    orjson = None
+
+try:
+    import faiss
+except ImportError:  # faiss is optional, fall back to the exact matrix-vector scan
+    faiss = None
+
+try:
+    import numba
+except ImportError:  # numba is optional, fall back to a float32 matrix-vector product
+    numba = None
 
 logger = logging.getLogger(__name__)
 
+_TOKEN_RE = re.compile(r"\w+")
+
+# Words too common to say anything about which chunk a query is about
+_STOPWORDS = frozenset([
+    'a', 'about', 'an', 'and', 'are', 'as', 'at', 'be', 'between', 'by', 'can', 'do', 'does',
+    'for', 'from', 'get', 'has', 'have', 'hello', 'hi', 'how', 'i', 'in', 'is', 'it', 'me',
+    'my', 'of', 'on', 'or', 'please', 'tell', 'that', 'the', 'this', 'to', 'us', 'was',
+    'we', 'what', 'when', 'where', 'which', 'who', 'why', 'with', 'you', 'your',
+])
+
+# Exact inner-product search for small corpora, HNSW graph search above this size
+_ANN_MIN_CHUNKS = 5000
+_HNSW_NEIGHBORS = 32
+_HNSW_EF_SEARCH = 64
+
+def _quantize(matrix: np.ndarray):
+    """
+    Quantize rows to int8 with one scale per row.
+    
+    Returns:
+        Tuple of (int8 codes, float32 scales) with matrix ~= codes * scales[:, None]
+    """
+    scales = np.maximum(np.abs(matrix).max(axis=1), 1e-12) / 127.0
+    codes = np.rint(matrix / scales[:, np.newaxis]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def _vector_paths(embeddings_path: str):
+    """Return the (int8 codes, row scales) .npy paths stored next to an embeddings file."""
+    base = os.path.splitext(embeddings_path)[0]
+    return base + "_codes.npy", base + "_scales.npy"
+
+def save_vectors(embeddings_path: str, vectors) -> None:
+    """
+    Save chunk embeddings next to an embeddings file for memory-mapped loading.
+    
+    Vectors are L2-normalized and stored as int8 codes plus one float32 scale per
+    row. Rows must be in the same order as the file's chunks.
+    
+    Args:
+        embeddings_path: Path to the embeddings JSON file
+        vectors: One embedding per chunk, shape (num_chunks, dim)
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    codes, scales = _quantize(matrix)
+    codes_path, scales_path = _vector_paths(embeddings_path)
+    np.save(codes_path, codes)
+    np.save(scales_path, scales)
+
+_score_int8 = None
+
+if numba is not None:
+    # Rows are independent, so they are split across cores
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _score_int8(codes, scales, query):
+        scores = np.empty(codes.shape[0], dtype=np.float32)
+        for i in numba.prange(codes.shape[0]):
+            total = np.float32(0.0)
+            for j in range(codes.shape[1]):
+                total += codes[i, j] * query[j]
+            scores[i] = total * scales[i]
+        return scores
+
+# Query results remembered per MOADEmbeddings instance
+_RESULT_CACHE_SIZE = 1024
+
+@lru_cache(maxsize=1024)
+def _embed_query(text: str) -> np.ndarray:
+    """
+    Embed a query with the OpenAI API as a unit-length float32 vector.
+    
+    Memoized so repeated queries skip the round-trip; the returned array is
+    shared between callers and therefore read-only. Failures raise instead of
+    returning None so they are never cached.
+    """
+    response = get_openai_client().embeddings.create(
+        input=text,
+        model=EMBEDDING_MODEL
+    )
+    vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+    vector /= max(float(np.linalg.norm(vector)), 1e-12)
+    vector.flags.writeable = False
+    return vector
+
 class MOADEmbeddings:
     """Handles embeddings-based search for MOAD content"""
     
@@ -21,12 +129,57 @@ class MOADEmbeddings:
                                           'data', 'moad_embeddings.json')
         
         self.embeddings_path = embeddings_path
-        self.embeddings_data = self._load_embeddings()
         
-        if self.embeddings_data:
-            logger.info(f"Loaded {len(self.embeddings_data.get('chunks', []))} MOAD content chunks")
-        else:
-            logger.warning("Failed to load MOAD embeddings data")
+        # Everything below is filled in by warmup(), on first use unless called earlier
+        self._embeddings_data: Optional[Dict[str, Any]] = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        
+        # Normalized chunk embeddings (None to use keyword matching): int8 codes with
+        # per-row scales when numba can score them, float32 rows otherwise. Large
+        # corpora get an approximate nearest-neighbor index instead.
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._index = None
+        self._dim = 0
+        
+        # Inverted index for keyword matching: lowercased word -> indices of the chunks containing it
+        self._postings = defaultdict(list)
+        
+        # Most recently used results: (normalized query, max_chunks) -> chunk indices
+        self._results = OrderedDict()
+        self._results_lock = threading.Lock()
+    
+    @property
+    def embeddings_data(self) -> Optional[Dict[str, Any]]:
+        """The loaded embeddings data, loading it first if needed."""
+        self.warmup()
+        return self._embeddings_data
+    
+    def warmup(self) -> None:
+        """
+        Load the chunk data, vectors and keyword index if not loaded yet.
+        
+        Loading is deferred so importing or constructing this class is cheap;
+        servers that want the cost paid up front call this at startup.
+        """
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            self._embeddings_data = self._load_embeddings()
+            
+            if self._embeddings_data:
+                logger.info(f"Loaded {len(self._embeddings_data.get('chunks', []))} MOAD content chunks")
+            else:
+                logger.warning("Failed to load MOAD embeddings data")
+            
+            self._build_index()
+            for i, chunk in enumerate((self._embeddings_data or {}).get('chunks', [])):
+                for token in set(_TOKEN_RE.findall(chunk.get('content', '').lower())):
+                    self._postings[token].append(i)
+            self._loaded = True
     
     def _load_embeddings(self) -> Optional[Dict[str, Any]]:
         """
@@ -40,12 +193,131 @@ class MOADEmbeddings:
                 logger.error(f"Embeddings file not found: {self.embeddings_path}")
                 return None
                 
-            with open(self.embeddings_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(self.embeddings_path, 'rb') as f:
+                raw = f.read()
+            return orjson.loads(raw) if orjson is not None else json.loads(raw)
         except Exception as e:
             logger.error(f"Error loading embeddings: {str(e)}")
             return None
     
+    def _load_vectors(self, num_chunks: int):
+        """
+        Memory-map the saved int8 chunk embeddings, if present.
+        
+        Args:
+            num_chunks: Number of chunks in the embeddings file
+        
+        Returns:
+            Tuple of (codes, scales), or (None, None) if no vectors file matches the chunks
+        """
+        codes_path, scales_path = _vector_paths(self.embeddings_path)
+        if not (os.path.exists(codes_path) and os.path.exists(scales_path)):
+            return None, None
+        
+        codes = np.load(codes_path, mmap_mode='r')
+        scales = np.load(scales_path, mmap_mode='r')
+        if codes.shape[0] != num_chunks or scales.shape[0] != num_chunks:
+            logger.warning(f"Ignoring {codes_path}: {codes.shape[0]} vectors for {num_chunks} chunks")
+            return None, None
+        return codes, scales
+    
+    def _build_index(self):
+        """
+        Set up the chunk embeddings for search, and an HNSW index for large corpora.
+        
+        Vectors come from the memory-mapped .npy files written by save_vectors(),
+        or else from 'embedding' lists in the JSON, which are dropped from the
+        chunk dicts once stacked. Vectors are L2-normalized so inner product
+        equals cosine similarity.
+        """
+        chunks = (self._embeddings_data or {}).get('chunks', [])
+        if not chunks:
+            return
+        
+        try:
+            codes, scales = self._load_vectors(len(chunks))
+            if codes is not None:
+                matrix = None
+            elif all(chunk.get('embedding') for chunk in chunks):
+                matrix = np.asarray([chunk.pop('embedding') for chunk in chunks], dtype=np.float32)
+                matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            else:
+                return
+            self._dim = (codes if matrix is None else matrix).shape[1]
+            
+            # Below the threshold one matrix-vector product beats graph traversal
+            if faiss is not None and len(chunks) >= _ANN_MIN_CHUNKS:
+                if matrix is None:
+                    matrix = codes.astype(np.float32) * scales[:, np.newaxis]
+                index = faiss.IndexHNSWFlat(self._dim, _HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+                index.hnsw.efSearch = _HNSW_EF_SEARCH
+                index.add(matrix)
+                self._index = index
+                search = 'HNSW'
+            elif _score_int8 is not None:
+                # A quarter of the bytes to stream per query; saved codes stay memory-mapped
+                if matrix is not None:
+                    codes, scales = _quantize(matrix)
+                self._vectors, self._scales = codes, scales
+                search = 'exact int8'
+            else:
+                self._vectors = matrix if matrix is not None else codes.astype(np.float32) * scales[:, np.newaxis]
+                search = 'exact'
+            logger.info(f"Indexed {len(chunks)} chunk embeddings ({search} search)")
+        except Exception as e:
+            logger.error(f"Error building embeddings index: {str(e)}")
+            self._vectors = self._scales = self._index = None
+    
+    def _search_vectors(self, query: str, max_chunks: int) -> Optional[List[int]]:
+        """
+        Find the chunks nearest to the query embedding.
+        
+        Returns:
+            Indices of the most similar chunks, best first, or None if the query can't be embedded
+        """
+        try:
+            # Whitespace differences don't change the meaning, so they share a cache entry
+            query_vector = _embed_query(' '.join(query.split()))
+            if query_vector.shape[0] != self._dim:
+                logger.error(f"Query embedding has {query_vector.shape[0]} dimensions, "
+                             f"chunk embeddings have {self._dim}")
+                return None
+            if self._index is not None:
+                _, ids = self._index.search(query_vector[np.newaxis, :], max_chunks)
+                ids = ids[0][ids[0] >= 0]
+            elif self._scales is not None:
+                ids = top_k_indices(_score_int8(self._vectors, self._scales, query_vector), max_chunks)
+            else:
+                ids = top_k_indices(self._vectors @ query_vector, max_chunks)
+        except Exception as e:
+            logger.warning(f"Vector search failed, falling back to keyword matching: {str(e)}")
+            return None
+        
+        return ids.tolist()
+    
+    def _search_keywords(self, query: str, max_chunks: int) -> List[int]:
+        """
+        Find the chunks sharing the most words with the query.
+        
+        Returns:
+            Indices of the best matching chunks, best first; ties keep chunk order
+        """
+        # Chunks sharing no word with the query are never visited
+        query_terms = set(_TOKEN_RE.findall(query.lower())) - _STOPWORDS
+        if len(query_terms) == 1:
+            # Every match scores 1, so the postings are already in result order
+            return self._postings.get(query_terms.pop(), [])[:max_chunks]
+        if not query_terms:
+            return []
+        
+        scores = defaultdict(int)
+        for term in query_terms:
+            for i in self._postings.get(term, ()):
+                scores[i] += 1
+        
+        # Take the top results without sorting every match
+        return heapq.nlargest(max_chunks, scores, key=lambda i: (scores[i], -i))
+    
     def get_relevant_context(self, query: str, max_chunks: int = 5) -> List[Dict[str, Any]]:
         """
         Get relevant content chunks for a query
@@ -57,36 +329,56 @@ class MOADEmbeddings:
         Returns:
             List of relevant content dictionaries with content and metadata
         """
-        if not self.embeddings_data or 'chunks' not in self.embeddings_data:
+        self.warmup()
+        if not self._embeddings_data or 'chunks' not in self._embeddings_data:
             logger.error("No embeddings data available")
             return []
+        
+        chunks = self._embeddings_data.get('chunks', [])
+        key = (' '.join(query.lower().split()), max_chunks)
+        with self._results_lock:
+            indices = self._results.get(key)
+            if indices is not None:
+                self._results.move_to_end(key)
+        
+        if indices is None:
+            use_vectors = (self._vectors is not None or self._index is not None) and get_openai_client() is not None
             
-        # This is a simplified version. In a real implementation, you would:
-        # 1. Generate embedding for the query using OpenAI or other embedding model
-        # 2. Calculate similarity scores with all chunks
-        # 3. Return the most similar chunks
-        
-        # For now, we'll return the first few chunks (placeholder implementation)
-        relevant_chunks = []
-        chunks = self.embeddings_data.get('chunks', [])
-        
-        # Simple keyword matching as placeholder
-        matched_chunks = []
-        query_terms = set(query.lower().split())
-        
-        for chunk in chunks:
-            content = chunk.get('content', '').lower()
-            match_score = sum(1 for term in query_terms if term in content)
-            if match_score > 0:
-                matched_chunks.append((chunk, match_score))
-        
-        # Sort by match score and take top results
-        matched_chunks.sort(key=lambda x: x[1], reverse=True)
-        relevant_chunks = [chunk for chunk, _ in matched_chunks[:max_chunks]]
-        
-        if not relevant_chunks and chunks:
-            # Fallback to first few chunks if no matches
-            relevant_chunks = chunks[:max_chunks]
+            # Rank chunks by embedding similarity when vectors and an API key are available
+            if use_vectors:
+                indices = self._search_vectors(query, max_chunks)
             
+            # A failed vector search falls back to keywords, but only for this call
+            cacheable = indices is not None or not use_vectors
+            if indices is None:
+                indices = self._search_keywords(query, max_chunks)
+                if not indices and chunks:
+                    # Fallback to first few chunks if no matches
+                    indices = range(min(max_chunks, len(chunks)))
+            indices = tuple(indices)
+            
+            if cacheable:
+                with self._results_lock:
+                    self._results[key] = indices
+                    if len(self._results) > _RESULT_CACHE_SIZE:
+                        self._results.popitem(last=False)
+        
+        relevant_chunks = [chunks[i] for i in indices]
         logger.info(f"Found {len(relevant_chunks)} relevant chunks for query: {query}")
-        return relevant_chunks 
\ No newline at end of file
+        return relevant_chunks
+
+@lru_cache(maxsize=None)
+def get_moad_embeddings(embeddings_path: str = None) -> MOADEmbeddings:
+    """
+    Get the process-wide MOADEmbeddings for an embeddings file.
+    
+    The data and vectors are loaded once per process and shared by every
+    caller, instead of once per service instance.
+    
+    Args:
+        embeddings_path: Path to the embeddings data file (default: data/moad_embeddings.json)
+        
+    Returns:
+        Shared MOADEmbeddings instance
+    """
+    return MOADEmbeddings(embeddings_path)
\ No newline at end of file
@@ -0,0 +1,38 @@
+import os
+from typing import Any, Optional
+
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:  # h2 is optional, without it connections use HTTP/1.1 keep-alive
+    _HTTP2 = False
+
+# Process-wide OpenAI client, created on first use once an API key is available
+_CLIENT = None
+
+def get_openai_client() -> Optional[Any]:
+    """
+    Return the OpenAI client shared by every caller in the process.
+
+    Chat completions and query embeddings go through the same client, so they
+    share one pool of keep-alive connections (and their TLS sessions) instead
+    of each opening its own. The key is only looked up until a client has been
+    created, so hot paths do not re-read the environment.
+
+    Returns:
+        The client, or None if OPENAI_API_KEY is not set
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if api_key:
+            import httpx
+            from openai import OpenAI, DefaultHttpxClient
+            _CLIENT = OpenAI(
+                api_key=api_key,
+                http_client=DefaultHttpxClient(
+                    http2=_HTTP2,
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+                )
+            )
+    return _CLIENT
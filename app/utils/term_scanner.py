@@ -0,0 +1,55 @@
+import re
+from typing import Dict, FrozenSet, Iterable, Set
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is optional, fall back to a compiled regex
+    ahocorasick = None
+
+class TermScanner:
+    """Finds which of a fixed set of terms occur in a text using a single pass."""
+
+    def __init__(self, terms: Iterable[str]):
+        """
+        Build the scanner for a fixed vocabulary.
+
+        Args:
+            terms: Lowercase terms to look for (substring semantics, like `term in text`)
+        """
+        self.terms: FrozenSet[str] = frozenset(terms)
+
+        if ahocorasick is not None:
+            # Aho-Corasick reports every (overlapping) match in one traversal
+            self._automaton = ahocorasick.Automaton()
+            for term in self.terms:
+                self._automaton.add_word(term, term)
+            self._automaton.make_automaton()
+            self._pattern = None
+        else:
+            # A lookahead alternation matches at every position, longest term first;
+            # shorter terms that are prefixes of a match are added back via _prefixes
+            self._automaton = None
+            alternation = "|".join(re.escape(t) for t in sorted(self.terms, key=len, reverse=True))
+            self._pattern = re.compile(f"(?=({alternation}))")
+            self._prefixes: Dict[str, FrozenSet[str]] = {
+                term: frozenset(t for t in self.terms if term.startswith(t))
+                for term in self.terms
+            }
+
+    def find(self, text: str) -> Set[str]:
+        """
+        Return the set of terms that occur in the text.
+
+        Args:
+            text: Text to scan (should already be lowercased)
+
+        Returns:
+            Set of matched terms
+        """
+        if self._automaton is not None:
+            return {term for _, term in self._automaton.iter(text)}
+
+        found = set()
+        for term in set(self._pattern.findall(text)):
+            found |= self._prefixes[term]
+        return found
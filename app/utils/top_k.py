@@ -0,0 +1,28 @@
+import numpy as np
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Return the indices of the k highest scores, best first.
+    
+    Uses np.partition so only the k survivors are sorted. Ties, including
+    ties at the cutoff, keep the earliest indices, matching a stable full sort.
+    
+    Args:
+        scores: One score per item
+        k: Maximum number of indices to return
+    
+    Returns:
+        Indices into scores, ordered by descending score
+    """
+    n = scores.size
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:k - above.size]
+        idx = np.sort(np.concatenate((above, ties)))
+    else:
+        idx = np.arange(n)
+    return idx[np.argsort(-scores[idx], kind='stable')]
@@ -0,0 +1,21 @@
+"""Gunicorn configuration for the MOAD AI Query Application (gunicorn wsgi:app)."""
+import os
+import multiprocessing
+
+bind = f"{os.environ.get('FLASK_HOST', '127.0.0.1')}:{os.environ.get('FLASK_PORT', 5000)}"
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+
+# Load the app, and with it the MOAD embeddings, once in the master process;
+# forked workers share those pages copy-on-write instead of each loading a copy
+preload_app = True
+
+def when_ready(server):
+    """Load the MOAD embeddings and close the query cache connection before any worker is forked."""
+    from app import routes
+    routes.query_service.embeddings.warmup()
+    routes.query_service.cache.close()
+
+def post_fork(server, worker):
+    """Give each worker its own query cache connection."""
+    from app import routes
+    routes.query_service.cache.reopen()
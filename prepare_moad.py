@@ -9,7 +9,18 @@ import sys
 import time
 import argparse
 import json
+import re
 from app.utils.extractors.pptx_extractor import PPTXExtractor
+from app.utils.embedding_inputs import EMBEDDING_MODEL, embedding_batches
+from app.utils.moad_embeddings import save_vectors
+from app.utils.openai_client import get_openai_client
+
+# Most slides sent per embeddings API request; requests are also capped by total tokens
+EMBEDDING_BATCH_SIZE = 256
+
+# Slide title line and trailing slide number, compiled once for the per-slide loop
+_TITLE_RE = re.compile(r'^Title: (.+)$', re.MULTILINE)
+_SLIDE_NUMBER_RE = re.compile(r'(\d+)$')
 
 def extract_content_to_json(pptx_path, json_path):
     """Extract content from PowerPoint and save to JSON."""
@@ -20,9 +31,9 @@ def extract_content_to_json(pptx_path, json_path):
         extractor = PPTXExtractor(pptx_path)
         content = extractor.extract_all_slides()
         
-        # Save to JSON
+        # Save as compact JSON; indentation only adds bytes to read and parse
         with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(content, f, ensure_ascii=False, indent=2)
+            json.dump(content, f, ensure_ascii=False, separators=(',', ':'))
         
         print(f"JSON preparation completed in {time.time() - start_time:.2f} seconds")
         print(f"Extracted {len(content)} slides")
@@ -34,11 +45,67 @@ def extract_content_to_json(pptx_path, json_path):
         print("Please check that the PowerPoint file is valid and accessible.")
         return None
 
+def build_embeddings(content, pptx_path, embeddings_path):
+    """Embed each slide in batched API requests and save them as MOAD embedding chunks."""
+    print(f"\n--- Preparing Embeddings ---")
+    start_time = time.time()
+    
+    client = get_openai_client()
+    if client is None:
+        print("ERROR: OPENAI_API_KEY is not set, cannot generate embeddings")
+        return False
+    
+    try:
+        # The API rejects empty inputs, so slides without text are left out
+        chunks = []
+        for slide_id, text in content.items():
+            if not text.strip():
+                continue
+            title = _TITLE_RE.search(text)
+            number = _SLIDE_NUMBER_RE.search(slide_id)
+            chunks.append({
+                'id': slide_id,
+                'title': title.group(1).strip() if title else slide_id,
+                'slide_number': int(number.group(1)) if number else None,
+                'content': text,
+                'source_file': os.path.basename(pptx_path)
+            })
+        
+        # One request per batch of slides instead of one per slide, each input
+        # truncated to the model's token limit and each request kept under its budget
+        vectors = []
+        for batch in embedding_batches((chunk['content'] for chunk in chunks), EMBEDDING_BATCH_SIZE):
+            response = client.embeddings.create(input=batch, model=EMBEDDING_MODEL)
+            vectors.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+            print(f"Embedded {len(vectors)}/{len(chunks)} slides")
+        
+        data = {
+            'metadata': {
+                'version': '1.0',
+                'created_at': time.strftime('%Y-%m-%d'),
+                'source': os.path.basename(pptx_path),
+                'embedding_model': EMBEDDING_MODEL
+            },
+            'chunks': chunks
+        }
+        with open(embeddings_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        save_vectors(embeddings_path, vectors)
+        
+        print(f"Embeddings prepared in {time.time() - start_time:.2f} seconds")
+        print(f"Embeddings saved next to: {embeddings_path}")
+        return True
+    except Exception as e:
+        print(f"ERROR: Failed to generate embeddings: {str(e)}")
+        return False
+
 def main():
     """Main function to prepare MOAD content."""
     parser = argparse.ArgumentParser(description="Prepare MOAD content for faster queries")
     parser.add_argument('--pptx', default='moad.pptx', help='Path to the MOAD PowerPoint file')
     parser.add_argument('--output', default='moad_content.json', help='Path to save the extracted content')
+    parser.add_argument('--embeddings', help='Also embed the slides and save them to this MOAD embeddings file '
+                                             '(e.g. data/moad_embeddings.json); requires OPENAI_API_KEY')
     parser.add_argument('--skip-errors', action='store_true', help='Continue processing even if errors occur')
     args = parser.parse_args()
     
@@ -58,6 +125,11 @@ def main():
         print("\nExtraction had errors but --skip-errors flag was set.")
         print("Continuing with partial results.")
     
+    if content and args.embeddings:
+        if not build_embeddings(content, args.pptx, args.embeddings) and not args.skip_errors:
+            print("\nEmbedding failed. Please check the errors above.")
+            return 1
+    
     print("\nMOAD content preparation complete!")
     print("You can now start the application for faster queries.")
     return 0
@@ -2,14 +2,15 @@
 """Run script for the MOAD AI Query Application."""
 
 import os
-from dotenv import load_dotenv
-from app import create_app
+import sys
+from importlib.util import find_spec
 
-# Load environment variables
-load_dotenv()
-
-# Create Flask application
-app = create_app()
+# Load environment variables before reading the server settings below; without
+# a .env file dotenv isn't imported or searched for
+_ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+if os.path.exists(_ENV_FILE):
+    from dotenv import load_dotenv
+    load_dotenv(_ENV_FILE)
 
 if __name__ == '__main__':
     # Get configuration from environment
@@ -17,6 +18,22 @@ if __name__ == '__main__':
     port = int(os.environ.get('FLASK_PORT', 5000))
     debug = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     
+    # In production hand over to gunicorn; the development server runs a single process.
+    # The app is not created first: gunicorn loads its own copy from wsgi.py.
+    if os.environ.get('FLASK_ENV') == 'production' and not debug:
+        if find_spec('gunicorn') is None:
+            sys.exit("gunicorn is not installed in this environment; install requirements.txt "
+                     "or unset FLASK_ENV=production to use the development server")
+        project_dir = os.path.dirname(os.path.abspath(__file__))
+        print(f"Starting MOAD AI Query Server with gunicorn on {host}:{port}")
+        sys.stdout.flush()
+        os.execv(sys.executable, [sys.executable, '-m', 'gunicorn', '--chdir', project_dir,
+                                  '-c', os.path.join(project_dir, 'gunicorn.conf.py'), 'wsgi:app'])
+    
+    # Create Flask application
+    from app import create_app
+    app = create_app()
+    
     # Output server information
     print(f"Starting MOAD AI Query Server on {host}:{port}")
     print(f"Debug mode: {'ON' if debug else 'OFF'}")
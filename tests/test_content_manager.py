@@ -0,0 +1,41 @@
+import unittest
+
+from app.api.content_manager import _is_license_comparison
+
+
+class LicenseComparisonQueryTest(unittest.TestCase):
+    """License comparison detection must accept plural and inflected forms."""
+
+    def test_plural_and_inflected_forms(self):
+        for query in [
+            "Compare ITSM editions",
+            "differences between the licenses",
+            "compared to professional",
+            "licensing difference",
+            "What are the tiers and how do they differ? Compare them",
+        ]:
+            with self.subTest(query=query):
+                self.assertTrue(_is_license_comparison(query))
+
+    def test_base_forms(self):
+        for query in [
+            "Pro vs Enterprise",
+            "ITSM Pro+ versus Standard",
+            "license comparison for HRSD",
+            "difference between standard and pro",
+        ]:
+            with self.subTest(query=query):
+                self.assertTrue(_is_license_comparison(query))
+
+    def test_needs_both_license_and_comparison_words(self):
+        for query in [
+            "What is Virtual Agent?",
+            "Which license includes Now Assist?",
+            "compare the two workflows",
+        ]:
+            with self.subTest(query=query):
+                self.assertFalse(_is_license_comparison(query))
+
+
+if __name__ == "__main__":
+    unittest.main()
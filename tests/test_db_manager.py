@@ -0,0 +1,68 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from app.api.db_manager import DatabaseManager
+
+
+class QueryCacheWriteThroughTest(unittest.TestCase):
+    """Cached query results must reach disk without waiting for close()."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._tmp.name, "moad.sqlite")
+        self.managers = []
+
+    def tearDown(self):
+        for manager in self.managers:
+            manager.close()
+        self._tmp.cleanup()
+
+    def _manager(self):
+        manager = DatabaseManager(self.db_path)
+        self.managers.append(manager)
+        return manager
+
+    def test_result_visible_to_other_connection_before_close(self):
+        writer, reader = self._manager(), self._manager()
+        writer.cache_query("Pro vs Enterprise", {"summary": "a"})
+        self.assertEqual(reader.get_cached_query("pro  vs enterprise"), {"summary": "a"})
+
+    def test_close_keeps_rows_written_by_others(self):
+        first, second = self._manager(), self._manager()
+        first.cache_query("first", {"summary": 1})
+        second.cache_query("second", {"summary": 2})
+        first.close()
+        second.close()
+        reopened = self._manager()
+        self.assertEqual(reopened.get_cached_query("first"), {"summary": 1})
+        self.assertEqual(reopened.get_cached_query("second"), {"summary": 2})
+
+    def test_expired_entries_are_not_returned(self):
+        manager = self._manager()
+        manager.cache_query("stale", {"summary": 0})
+        self.assertIsNone(manager.get_cached_query("stale", expiry_time=-1))
+
+    def test_concurrent_reads_and_writes_share_one_connection(self):
+        manager = self._manager()
+        errors = []
+
+        def worker(n):
+            for i in range(50):
+                query = f"query {n} {i}"
+                if not manager.cache_query(query, {"summary": i}):
+                    errors.append(("write", query))
+                if manager.get_cached_query(query) != {"summary": i}:
+                    errors.append(("read", query))
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
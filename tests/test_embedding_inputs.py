@@ -0,0 +1,32 @@
+import unittest
+from unittest import mock
+
+from app.utils import embedding_inputs
+from app.utils.embedding_inputs import embedding_batches, truncate_for_embedding
+
+
+class EmbeddingBatchesTest(unittest.TestCase):
+    """Embedding requests must respect both the input-count and token budgets."""
+
+    def test_batches_keep_order_and_input_count(self):
+        texts = [f"slide {i}" for i in range(10)]
+        batches = list(embedding_batches(texts, max_inputs=4))
+        self.assertEqual([len(batch) for batch in batches], [4, 4, 2])
+        self.assertEqual([text for batch in batches for text in batch], texts)
+
+    def test_batches_stay_under_request_token_budget(self):
+        texts = ["x" * 8000] * 10
+        with mock.patch.object(embedding_inputs, "_MAX_REQUEST_TOKENS", 20000), \
+                mock.patch.object(embedding_inputs, "_embedding_encoding", return_value=None):
+            batches = list(embedding_batches(texts, max_inputs=256))
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 2, 2, 2])
+
+    def test_long_inputs_are_truncated(self):
+        with mock.patch.object(embedding_inputs, "_embedding_encoding", return_value=None):
+            text, num_tokens = truncate_for_embedding("y" * 20000)
+        self.assertEqual(len(text), embedding_inputs._MAX_INPUT_CHARS)
+        self.assertEqual(num_tokens, len(text))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+from app.api.license_analyzer import LicenseAnalyzer
+
+
+class AnalysisCacheTest(unittest.TestCase):
+    """Cached analyses must not be shared with, or changed by, callers."""
+
+    SLIDES = [
+        "ITSM Pro includes Virtual Agent.\n--- Tables ---\n"
+        "Table 1:\nFeature | Standard | Pro\nVirtual Agent | No | Yes",
+    ]
+    QUERY = "Is Virtual Agent in ITSM Standard or Pro?"
+
+    def test_repeated_analysis_returns_equal_copies(self):
+        analyzer = LicenseAnalyzer()
+        first = analyzer.analyze_license_differences(self.SLIDES, self.QUERY)
+        second = analyzer.analyze_license_differences(self.SLIDES, self.QUERY)
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        self.assertIsNot(first["tiers"], second["tiers"])
+        self.assertIsNot(first["tables"], second["tables"])
+
+    def test_caller_changes_do_not_reach_the_cache(self):
+        analyzer = LicenseAnalyzer()
+        first = analyzer.analyze_license_differences(self.SLIDES, self.QUERY)
+        expected = analyzer.analyze_license_differences(self.SLIDES, self.QUERY)
+        first["tiers"]["standard"] = "changed"
+        first["tables"].clear()
+        self.assertEqual(analyzer.analyze_license_differences(self.SLIDES, self.QUERY), expected)
+
+    def test_default_knowledge_is_not_exposed(self):
+        analyzer = LicenseAnalyzer()
+        result = analyzer.analyze_license_differences(["No licensing details here."], "virtual agent tiers")
+        result["tiers"]["standard"] = True
+        self.assertFalse(analyzer.feature_defaults["virtual agent"]["standard"])
+
+
+if __name__ == "__main__":
+    unittest.main()
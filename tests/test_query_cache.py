@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+
+from app.models.query_cache import QueryCache, _key
+
+
+class QueryCacheKeyTest(unittest.TestCase):
+    """Cache keys must merge rephrasings of one question but never two questions."""
+
+    def test_license_tiers_get_different_keys(self):
+        self.assertNotEqual(_key("ITSM Pro+ features"), _key("ITSM Pro features"))
+
+    def test_meaning_bearing_characters_are_kept(self):
+        self.assertNotEqual(_key("C# support"), _key("C support"))
+        self.assertNotEqual(_key("ITSM v2.0"), _key("ITSM v20"))
+
+    def test_case_whitespace_and_sentence_punctuation_are_folded(self):
+        self.assertEqual(_key("What is ITSM Pro+?"), _key("  what is itsm pro+ "))
+        self.assertEqual(_key("Compare Pro, Enterprise."), _key("compare pro enterprise"))
+
+    def test_tiers_are_cached_separately(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = QueryCache(os.path.join(tmp, "cache.json"))
+            try:
+                cache.set("ITSM Pro+ features", {"summary": "pro+"})
+                self.assertIsNone(cache.get("ITSM Pro features"))
+                self.assertEqual(cache.get("itsm pro+ features?"), {"summary": "pro+"})
+            finally:
+                cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+
+from app.utils.top_k import top_k_indices
+
+
+class TopKIndicesTest(unittest.TestCase):
+    """Top-k selection must match a stable full sort, ties included."""
+
+    def test_matches_stable_full_sort(self):
+        rng = np.random.default_rng(0)
+        scores = rng.integers(0, 5, size=200).astype(np.float32)
+        expected = np.argsort(-scores, kind="stable")
+        for k in (1, 3, 10, 50, 200, 500):
+            with self.subTest(k=k):
+                self.assertEqual(top_k_indices(scores, k).tolist(), expected[:k].tolist())
+
+    def test_ties_at_cutoff_keep_earliest_indices(self):
+        scores = np.array([0.5, 0.9, 0.5, 0.5, 0.1])
+        self.assertEqual(top_k_indices(scores, 2).tolist(), [1, 0])
+        self.assertEqual(top_k_indices(scores, 3).tolist(), [1, 0, 2])
+
+    def test_empty_selection(self):
+        self.assertEqual(top_k_indices(np.array([1.0, 2.0]), 0).size, 0)
+        self.assertEqual(top_k_indices(np.array([]), 5).size, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
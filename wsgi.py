@@ -1,9 +1,12 @@
 """WSGI entry point for the MOAD AI Query Application."""
 import os
-from dotenv import load_dotenv
 
-# Load environment variables before creating the app
-load_dotenv()
+# Load environment variables before creating the app; deployments that inject
+# them directly have no .env file, so dotenv isn't imported or searched for
+_ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+if os.path.exists(_ENV_FILE):
+    from dotenv import load_dotenv
+    load_dotenv(_ENV_FILE)
 
 # Set environment to production by default for wsgi
 os.environ.setdefault("FLASK_ENV", "production")
@@ -12,6 +15,3 @@ os.environ.setdefault("FLASK_DEBUG", "0")
 from app import create_app
 
 app = create_app()
-
-if __name__ == "__main__":
-    app.run() 
\ No newline at end of file